@@ -1,6 +1,19 @@
 // Article detail page functionality
 // Load and display article content from JSON
 
+// Fetch a single article with its body from the admin server;
+// returns null when the API is unavailable (e.g. the static site)
+async function fetchArticle(articleId) {
+  try {
+    const response = await fetch(`/api/articles/${encodeURIComponent(articleId)}`, { cache: 'no-store' });
+    if (!response.ok) return null;
+    const data = await response.json();
+    return data.success ? data.article : null;
+  } catch (error) {
+    return null;
+  }
+}
+
 async function fetchArticles() {
   const response = await fetch('posts/articles.json', { cache: 'no-store' });
   if (!response.ok) throw new Error('加载文章失败');
@@ -84,6 +97,12 @@ async function init() {
   
   try {
     console.log('开始获取文章数据...');
+    const single = await fetchArticle(articleId);
+    if (single) {
+      renderArticle(single);
+      console.log('文章渲染完成');
+      return;
+    }
     const articles = await fetchArticles();
     console.log('获取到文章数量:', articles.length);
     console.log('所有文章ID:', articles.map(a => a.id));
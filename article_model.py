@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章数据模型
+Article 使用 __slots__ 存放文章字段，替代每篇文章一个带重复字符串键的dict：
+
+- 标签、来源、日期等大量重复的取值经 sys.intern 驻留，所有文章共用同一个字符串对象
+- 正文是惰性属性：访问 article.content 时才通过loader读取，不访问就不占内存
+- 与现有JSON结构互相转换：Article.from_dict(data) / article.to_dict()，
+  未知字段（如original_filename、download_link）原样保留在extra中
+- 兼容按dict方式读取的旧代码：article['id']、article.get('tags', [])
+
+derive_fields() 在写入时从正文HTML一次性提取纯文本、字数、图片数和封面图，
+作为元数据保存，读取方（统计、构建、搜索）直接使用而不再重新解析正文。
+"""
+
+import re
+import sys
+import html
+
+# 固定字段，按articles.json中的键顺序排列
+FIELDS = ('id', 'title', 'source', 'summary', 'url', 'date', 'tags')
+# 写入时从正文派生的字段
+DERIVED_FIELDS = ('plain_text', 'word_count', 'image_count', 'cover_image')
+OPTIONAL_FIELDS = ('pdf_path', 'content_sha256') + DERIVED_FIELDS
+
+# plain_text只保存正文开头的这么多字符，供搜索和摘要使用，避免元数据随正文膨胀
+PLAIN_TEXT_LIMIT = 500
+
+_SCRIPT_STYLE_PATTERN = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_SPACE_PATTERN = re.compile(r'\s+')
+# 中日韩字符每字计一词，其余按连续的字母数字计词
+_WORD_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]|[A-Za-z0-9]+')
+# 封面图按顺序尝试，与原先构建脚本的匹配规则一致
+_COVER_PATTERNS = (
+    re.compile(r'<img[^>]+src="([^"]+)"'),
+    re.compile(r'data-src="([^"]+)"'),
+    re.compile(r'src="([^"]+)"'),
+)
+
+
+def html_to_text(content):
+    """去掉标签、脚本和样式，反转义实体并合并空白"""
+    text = _SCRIPT_STYLE_PATTERN.sub(' ', content or '')
+    text = html.unescape(_TAG_PATTERN.sub(' ', text))
+    return _SPACE_PATTERN.sub(' ', text).strip()
+
+
+def find_cover_image(content):
+    """正文中第一张图片的地址，没有时返回空字符串"""
+    for pattern in _COVER_PATTERNS:
+        match = pattern.search(content or '')
+        if match:
+            return match.group(1)
+    return ''
+
+
+def derive_fields(content):
+    """从正文HTML派生的元数据字段"""
+    text = html_to_text(content)
+    return {
+        'plain_text': text[:PLAIN_TEXT_LIMIT],
+        'word_count': len(_WORD_PATTERN.findall(text)),
+        'image_count': (content or '').count('<img'),
+        'cover_image': find_cover_image(content)
+    }
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Article:
+    """一篇文章：元数据常驻，正文按需加载
+
+    loader(article_id) 返回正文字符串；加载的正文不缓存在对象上，
+    由存储层的冷热分层缓存负责复用，遍历大量文章时内存不会随访问累积。
+    显式赋值的正文（如爬虫刚抓取的文章）会保存在对象上。
+    """
+
+    __slots__ = ('id', 'title', 'source', 'summary', 'url', 'date', 'tags',
+                 'pdf_path', 'content_sha256', 'plain_text', 'word_count', 'image_count', 'cover_image',
+                 'extra', '_content', '_loader')
+
+    def __init__(self, id, title=None, source=None, summary=None, url=None, date=None, tags=(),
+                 pdf_path=None, content_sha256=None, extra=None, content=None, loader=None,
+                 plain_text=None, word_count=None, image_count=None, cover_image=None):
+        self.id = id
+        self.title = title
+        self.source = _intern(source)
+        self.summary = summary
+        self.url = url
+        self.date = _intern(date)
+        self.tags = tuple(_intern(tag) for tag in tags or ())
+        self.pdf_path = pdf_path
+        self.content_sha256 = content_sha256
+        self.plain_text = plain_text
+        self.word_count = word_count
+        self.image_count = image_count
+        self.cover_image = cover_image
+        # 没有额外字段时不创建空dict
+        self.extra = extra or None
+        self._content = content
+        self._loader = loader
+
+    @classmethod
+    def from_dict(cls, data, loader=None):
+        """从现有JSON结构的dict创建"""
+        extra = {key: value for key, value in data.items()
+                 if key not in FIELDS and key not in OPTIONAL_FIELDS and key != 'content'}
+        return cls(
+            data['id'],
+            data.get('title'),
+            data.get('source'),
+            data.get('summary'),
+            data.get('url'),
+            data.get('date'),
+            data.get('tags') or (),
+            data.get('pdf_path'),
+            data.get('content_sha256'),
+            extra,
+            data.get('content'),
+            loader,
+            *(data.get(field) for field in DERIVED_FIELDS)
+        )
+
+    def to_dict(self, with_content=False):
+        """转换为现有JSON结构的dict（原数据中缺少的字段不输出）"""
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if field == 'tags':
+                data[field] = list(value)
+            elif value is not None:
+                data[field] = value
+        if with_content:
+            data['content'] = self.content
+        for field in OPTIONAL_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @property
+    def content(self):
+        """正文，首次访问时才读取"""
+        if self._content is not None:
+            return self._content
+        if self._loader is None:
+            return ''
+        return self._loader(self.id) or ''
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
+    @property
+    def content_loaded(self):
+        """正文是否已在对象上（显式赋值或随数据传入）"""
+        return self._content is not None
+
+    # 兼容按dict方式读取的代码
+    def get(self, key, default=None):
+        if key == 'content':
+            return self.content
+        if key in self.__slots__ and not key.startswith('_') and key != 'extra':
+            value = getattr(self, key)
+            return default if value is None else value
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        if key == 'content':
+            return self._content is not None or self._loader is not None
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __eq__(self, other):
+        if not isinstance(other, Article):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Article(id={self.id!r}, title={self.title!r}, date={self.date!r})"
+
+
+_MISSING = object()
@@ -0,0 +1,3094 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章数据存储模块
+统一负责文章数据的读取、缓存和写入，供server、crawler、pdf_processor共用
+
+提供两种存储引擎，通过环境变量 ARTICLE_STORE_ENGINE 选择（默认json）：
+
+json（默认）:
+    posts/store/index.json          文章元数据快照（不含正文）
+    posts/store/journal.log         快照之后的变更日志，只追加，定期压缩进快照
+    posts/store/content/<sha256>.html  文章正文，按需读取
+    （ARTICLE_CONTENT_BACKEND=mmap 时正文改为存放在 content-<n>.blob + content.table，
+     读取时从内存映射中按偏移切片，多个进程共享同一份页缓存）
+
+sqlite:
+    posts/store/articles.db         id主键、date/source二级索引、标签关联表，WAL模式
+
+正文按SHA-256摘要寻址：文章元数据的content_sha256字段引用正文，相同正文只存一份，
+正文和元数据都未变化的重复导入不产生写入；正文在最后一个引用它的文章删除或改写后回收，
+gc() 会再做一次全量清理。
+
+正文以压缩形式存放（ARTICLE_CONTENT_COMPRESSION=auto|zstd|zlib|none，默认auto：
+安装了zstandard时用zstd，否则zlib），读取时透明解压；未压缩的旧正文照常可读，
+执行 python3 article_store.py compress 可按当前配置重新压缩，sizes 查看压缩效果。
+读取正文时经过冷热分层缓存：最近的文章正文常驻内存，较早的正文按需解压进有内存上限的LRU。
+
+正文被替换时保留旧版本：存为相对新正文的差量（json引擎为 posts/store/history/<id>.jsonl，
+sqlite为article_history表），每篇最多保留 ARTICLE_HISTORY_LIMIT 个（默认20），
+history() 列出版本，get_version() 沿差量链还原，restore_article_version() 恢复。
+
+两种引擎都通过导出生成 posts/articles.json，供前端页面和静态构建使用。
+"""
+
+import os
+import re
+import sys
+import mmap
+import base64
+import bisect
+import collections
+import contextlib
+import datetime
+import difflib
+import sqlite3
+import hashlib
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+import serializer
+from article_model import Article, DERIVED_FIELDS, derive_fields
+
+ARTICLES_FILE = 'posts/articles.json'
+STORE_DIR = 'posts/store'
+INDEX_FILE = os.path.join(STORE_DIR, 'index.json')
+CONTENT_DIR = os.path.join(STORE_DIR, 'content')
+DB_FILE = os.path.join(STORE_DIR, 'articles.db')
+
+# 存储引擎：json 或 sqlite
+STORE_ENGINE = os.environ.get('ARTICLE_STORE_ENGINE', 'json').lower()
+
+# json引擎的正文存储方式：files（每篇一个文件）或 mmap（单个只追加blob + 偏移表）
+CONTENT_BACKEND = os.environ.get('ARTICLE_CONTENT_BACKEND', 'files').lower()
+
+# 跨进程存储锁的默认等待超时（秒）
+LOCK_TIMEOUT = float(os.environ.get('ARTICLE_STORE_LOCK_TIMEOUT', '30'))
+
+# 压缩后的正文以 NUL + 算法标识 开头；正常的UTF-8正文不会以NUL开头，未压缩的旧数据可直接识别
+_COMPRESSION_HEADERS = {'zlib': b'\x00z', 'zstd': b'\x00s'}
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+# 短于该字节数的正文压缩收益有限，原样存放
+COMPRESS_MIN_BYTES = 512
+
+# 正文热层：按日期最新的N篇，以及最近K周内（0表示不按周）的文章正文常驻内存
+HOT_ARTICLES = int(os.environ.get('ARTICLE_HOT_ARTICLES', '50'))
+HOT_WEEKS = int(os.environ.get('ARTICLE_HOT_WEEKS', '0'))
+# 冷层正文按需解压后放入LRU缓存的内存上限
+COLD_CACHE_BYTES = int(float(os.environ.get('ARTICLE_COLD_CACHE_MB', '32')) * 1024 * 1024)
+
+# 每篇文章保留的历史版本数
+HISTORY_LIMIT = int(os.environ.get('ARTICLE_HISTORY_LIMIT', '20'))
+
+# 可直接作为文件名的文章ID
+_SAFE_ID_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+def _file_key(path):
+    """获取文件校验键 (mtime, size, inode)，文件不存在时返回None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _fsync_dir(directory):
+    """同步目录项，保证rename在崩溃后依然可见"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path, data):
+    """先写入同目录临时文件并fsync，再原子替换目标文件，返回写入字节数"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    _fsync_dir(directory)
+    return len(data)
+
+
+def iso_week_range(year, week):
+    """ISO周的起止日期字符串 (周一, 周日)"""
+    monday = datetime.date.fromisocalendar(year, week, 1)
+    return monday.isoformat(), (monday + datetime.timedelta(days=6)).isoformat()
+
+
+def _select_compression(name):
+    """解析正文压缩配置：auto/zstd 在安装了zstandard时使用zstd，否则zlib；none 不压缩"""
+    if name == 'none':
+        return None
+    if name in ('auto', 'zstd') and zstandard is not None:
+        return 'zstd'
+    if name == 'zstd':
+        print("⚠️ 未安装zstandard，正文压缩改用zlib（pip install zstandard）")
+    return 'zlib'
+
+
+# 正文压缩方式：ARTICLE_CONTENT_COMPRESSION=auto|zstd|zlib|none，默认auto
+CONTENT_COMPRESSION = _select_compression(os.environ.get('ARTICLE_CONTENT_COMPRESSION', 'auto').lower())
+
+
+def _pack_content(content, codec=CONTENT_COMPRESSION):
+    """把正文编码为存储字节：压缩后更小时加上算法头，否则保留原始UTF-8"""
+    data = content.encode('utf-8')
+    if codec is None or len(data) < COMPRESS_MIN_BYTES:
+        return data
+    if codec == 'zstd':
+        packed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        packed = zlib.compress(data, ZLIB_LEVEL)
+    packed = _COMPRESSION_HEADERS[codec] + packed
+    return packed if len(packed) < len(data) else data
+
+
+def _content_codec(data):
+    """存储字节使用的压缩算法，未压缩时返回None"""
+    if isinstance(data, (bytes, bytearray)) and data[:1] == b'\x00':
+        for codec, header in _COMPRESSION_HEADERS.items():
+            if data[:2] == header:
+                return codec
+    return None
+
+
+def _unpack_content(data):
+    """把存储字节还原为正文字符串；兼容未压缩的旧数据（包括SQLite中的TEXT）"""
+    if not data:
+        return ''
+    if isinstance(data, str):
+        return data
+    codec = _content_codec(data)
+    if codec == 'zlib':
+        data = zlib.decompress(data[2:])
+    elif codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("正文使用zstd压缩，读取需要安装zstandard（pip install zstandard）")
+        data = zstandard.ZstdDecompressor().decompress(data[2:])
+    return data.decode('utf-8')
+
+
+class StoreLockTimeout(TimeoutError):
+    """等待存储锁超时"""
+
+
+class CommandError(ValueError):
+    """变更命令格式错误或暂存失败；抛出时该批次尚未写入任何数据，可以逐条重试"""
+
+
+class StoreLock:
+    """跨进程的读写咨询锁（fcntl.flock），保护存储文件的读-改-写过程
+
+    服务器与命令行爬虫/PDF处理器同时写入时，写者持有独占锁，
+    读者从磁盘重新加载索引时持有共享锁，不会读到写了一半的快照和日志。
+    进程内多个读线程共用一次共享锁，写线程独占；持有独占锁的线程可重入。
+    有线程等待独占锁时不再接纳新的读者，持续的读请求不会饿死写线程；
+    持有共享锁的线程不能升级为独占锁（会与其他读者互相等待），直接抛出RuntimeError。
+    等待flock时不持有进程内的条件变量，其他线程的释放和统计不受影响。
+    没有fcntl的平台（Windows）上退化为只在进程内互斥。
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._fd = None
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._owner = None
+        self._depth = 0
+        # 正在等待独占锁的线程数
+        self._writers_waiting = 0
+        # 有线程正在（在_cond之外）为读者获取共享flock
+        self._sharing = False
+        # 当前线程持有的共享锁层数
+        self._local = threading.local()
+        self._stats = {
+            'shared_acquired': 0,
+            'exclusive_acquired': 0,
+            'contended': 0,
+            'wait_ms_total': 0.0,
+            'wait_ms_max': 0.0,
+            'timeouts': 0
+        }
+
+    def _flock(self, operation, deadline):
+        """非阻塞地轮询flock直到成功或超时（调用方不持有_cond）"""
+        if fcntl is None:
+            return
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        delay = 0.005
+        while True:
+            try:
+                fcntl.flock(self._fd, operation | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    with self._cond:
+                        self._stats['timeouts'] += 1
+                    raise StoreLockTimeout(f"等待存储锁超时: {self.path}")
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+
+    def _unlock(self):
+        if fcntl is not None and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _wait(self, deadline):
+        """在_cond上等待状态变化，超时抛出StoreLockTimeout（调用方持有_cond）"""
+        if not self._cond.wait(max(deadline - time.monotonic(), 0)):
+            self._stats['timeouts'] += 1
+            raise StoreLockTimeout(f"等待存储锁超时: {self.path}")
+
+    def _record_wait(self, kind, started):
+        waited = (time.monotonic() - started) * 1000
+        self._stats[f'{kind}_acquired'] += 1
+        if waited >= 1:
+            self._stats['contended'] += 1
+        self._stats['wait_ms_total'] += waited
+        self._stats['wait_ms_max'] = max(self._stats['wait_ms_max'], waited)
+
+    def acquire_shared(self):
+        """获取共享锁，返回是否需要对应的release_shared()"""
+        me = threading.get_ident()
+        if self._owner == me:
+            return False
+        depth = getattr(self._local, 'shared', 0)
+        if depth:
+            # 已持有共享锁的线程重入时不排队，否则会与等待中的写者互相等待
+            self._local.shared = depth + 1
+            return True
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while self._owner is not None or self._writers_waiting or self._sharing:
+                self._wait(deadline)
+            if self._readers:
+                self._readers += 1
+                self._local.shared = 1
+                self._record_wait('shared', started)
+                return True
+            self._sharing = True
+        try:
+            self._flock(fcntl.LOCK_SH if fcntl else 0, deadline)
+        except BaseException:
+            with self._cond:
+                self._sharing = False
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._sharing = False
+            self._readers += 1
+            self._local.shared = 1
+            self._record_wait('shared', started)
+            self._cond.notify_all()
+        return True
+
+    def release_shared(self):
+        self._local.shared -= 1
+        if self._local.shared:
+            return
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._unlock()
+                self._cond.notify_all()
+
+    def acquire_exclusive(self):
+        me = threading.get_ident()
+        if self._owner == me:
+            self._depth += 1
+            return
+        if getattr(self._local, 'shared', 0):
+            raise RuntimeError(f"持有共享锁的线程不能升级为独占锁: {self.path}")
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._owner is not None or self._readers or self._sharing:
+                    self._wait(deadline)
+            finally:
+                self._writers_waiting -= 1
+            # 先占住进程内的所有权，再在_cond之外等待其他进程释放flock
+            self._owner = me
+            self._depth = 1
+        try:
+            self._flock(fcntl.LOCK_EX if fcntl else 0, deadline)
+        except BaseException:
+            with self._cond:
+                self._owner = None
+                self._depth = 0
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._record_wait('exclusive', started)
+
+    def release_exclusive(self):
+        with self._cond:
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._unlock()
+                self._cond.notify_all()
+
+    def shared(self):
+        return _LockContext(self.acquire_shared, self.release_shared)
+
+    def exclusive(self):
+        return _LockContext(self.acquire_exclusive, self.release_exclusive, always=True)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['wait_ms_total'] = round(stats['wait_ms_total'], 2)
+            stats['wait_ms_max'] = round(stats['wait_ms_max'], 2)
+            stats['backend'] = 'fcntl' if fcntl is not None else 'thread'
+            stats['timeout'] = self.timeout
+            return stats
+
+
+class _LockContext:
+    def __init__(self, acquire, release, always=False):
+        self._acquire = acquire
+        self._release = release
+        self._always = always
+        self._held = False
+
+    def __enter__(self):
+        held = self._acquire()
+        self._held = self._always or held
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._held:
+            self._release()
+        return False
+
+
+class ArticleIndex:
+    """文章元数据的内存索引
+
+    - records: id → 元数据 的哈希索引，按ID查找/更新为O(1)
+    - 展示顺序由每篇文章的顺序号(rank)单独维护：新文章取最大顺序号排在最前，
+      更新文章保留原顺序号，不再依赖列表位置和insert(0, ...)
+    - 按 (date, rank) 排序的日期索引，用二分查找维护和查询
+    - 正文摘要(content_sha256)的引用计数，正文blob在计数归零后才可删除
+    """
+
+    def __init__(self, articles=()):
+        self.records = {}
+        self.content_refs = {}
+        self._rank = {}
+        self._next_rank = 0
+        self._by_date = []
+        self._ordered = None
+        self._order_keys = None
+        # 列表第一篇排在最前，因此倒序插入
+        for meta in reversed(list(articles)):
+            self.upsert(meta)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, article_id):
+        return article_id in self.records
+
+    def get(self, article_id):
+        return self.records.get(article_id)
+
+    def _date_key(self, article_id):
+        return (self.records[article_id].get('date') or '', self._rank[article_id], article_id)
+
+    def _unindex_date(self, article_id):
+        key = self._date_key(article_id)
+        pos = bisect.bisect_left(self._by_date, key)
+        if pos < len(self._by_date) and self._by_date[pos] == key:
+            del self._by_date[pos]
+
+    def _ref(self, digest, delta):
+        if not digest:
+            return
+        count = self.content_refs.get(digest, 0) + delta
+        if count > 0:
+            self.content_refs[digest] = count
+        else:
+            self.content_refs.pop(digest, None)
+
+    def upsert(self, meta):
+        """新增或替换元数据，返回是否为新增"""
+        article_id = meta['id']
+        created = article_id not in self.records
+        if created:
+            self._next_rank += 1
+            self._rank[article_id] = self._next_rank
+            self._ordered = None
+        else:
+            self._unindex_date(article_id)
+            self._ref(self.records[article_id].get('content_sha256'), -1)
+        self._ref(meta.get('content_sha256'), 1)
+        self.records[article_id] = dict(meta)
+        bisect.insort(self._by_date, self._date_key(article_id))
+        return created
+
+    def update(self, article_id, fields):
+        """部分更新元数据，返回更新后的记录，不存在时返回None"""
+        meta = self.records.get(article_id)
+        if meta is None:
+            return None
+        if 'content_sha256' in fields:
+            self._ref(meta.get('content_sha256'), -1)
+            self._ref(fields['content_sha256'], 1)
+        # 替换为新记录而不是原地修改，已发布的快照中的旧记录保持不变
+        if 'date' in fields:
+            self._unindex_date(article_id)
+            meta = self.records[article_id] = dict(meta, **fields)
+            bisect.insort(self._by_date, self._date_key(article_id))
+        else:
+            meta = self.records[article_id] = dict(meta, **fields)
+        return meta
+
+    def delete(self, article_id):
+        """删除元数据，返回被删除的记录，不存在时返回None"""
+        if article_id not in self.records:
+            return None
+        self._unindex_date(article_id)
+        del self._rank[article_id]
+        self._ordered = None
+        self._ref(self.records[article_id].get('content_sha256'), -1)
+        return self.records.pop(article_id)
+
+    def _ordered_ids(self):
+        if self._ordered is None:
+            self._ordered = sorted(self.records, key=self._rank.__getitem__, reverse=True)
+            # 取负的顺序号，升序排列，供二分定位分页游标
+            self._order_keys = [-self._rank[article_id] for article_id in self._ordered]
+        return self._ordered
+
+    def ordered(self):
+        """按展示顺序（新文章在前）返回元数据列表"""
+        return [self.records[article_id] for article_id in self._ordered_ids()]
+
+    def page(self, after=None, limit=None, match=None):
+        """按展示顺序取文章after之后满足match的最多limit篇，返回 (元数据列表, 是否还有更多)
+
+        after为上一页最后一篇的ID，二分定位起点；after不存在时抛出ValueError
+        """
+        ids = self._ordered_ids()
+        start = 0
+        if after is not None:
+            if after not in self._rank:
+                raise ValueError(f"分页游标对应的文章不存在: {after}")
+            start = bisect.bisect_right(self._order_keys, -self._rank[after])
+        page = []
+        for position in range(start, len(ids)):
+            meta = self.records[ids[position]]
+            if match is not None and not match(meta):
+                continue
+            if limit is not None and len(page) == limit:
+                return page, True
+            page.append(meta)
+        return page, False
+
+    def ids_by_date(self, newest_first=True):
+        """按日期排序的文章ID（同一天按展示顺序）"""
+        ids = [key[2] for key in self._by_date]
+        return ids[::-1] if newest_first else ids
+
+    def ids_between(self, start=None, end=None, limit=None):
+        """日期在[start, end]内的文章ID，新的在前，最多limit篇；二分定位范围，O(log n + k)"""
+        lo = 0 if start is None else bisect.bisect_left(self._by_date, (start,))
+        # (end, inf) 大于所有日期为end的键
+        hi = len(self._by_date) if end is None else bisect.bisect_right(self._by_date, (end, float('inf')))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return [key[2] for key in reversed(self._by_date[lo:hi])]
+
+
+def _apply_mutation(index, entry):
+    """把一条日志记录应用到文章索引上"""
+    op = entry['op']
+    if op == 'upsert':
+        index.upsert(entry['article'])
+    elif op == 'update':
+        index.update(entry['id'], entry['fields'])
+    elif op == 'delete':
+        index.delete(entry['id'])
+    elif op == 'batch':
+        for sub_entry in entry['entries']:
+            _apply_mutation(index, sub_entry)
+
+
+class ArticleCache:
+    """进程内文章缓存
+
+    缓存内容 = 快照文件(index.json) + 变更日志(journal.log)回放的结果。
+    以两个文件的 (mtime, size, inode) 作为校验键：都未变化时直接返回已解析的数据，
+    不再经过JSON解析；日志只是被追加（例如命令行爬虫写入）时只回放新增的部分，
+    其他变化则整体重新加载。
+    """
+
+    def __init__(self, snapshot_path, journal_path, file_lock=None):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.file_lock = file_lock
+        self._lock = threading.Lock()
+        self._snapshot_key = None
+        self._journal_ino = None
+        self._journal_offset = 0
+        self._index = None
+        self._snapshot_seq = 0
+        # 当前版本及其只读视图，索引每次变化都会产生新版本
+        self.version = 0
+        self._view = None
+        self.seq = 0
+        self.journal_entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.replays = 0
+
+    def _read_snapshot(self):
+        """读取快照，返回 (文章列表, 快照对应的日志序号)"""
+        try:
+            data = serializer.load_file(self.snapshot_path)
+        except FileNotFoundError:
+            return [], 0
+        # 兼容旧格式：直接是文章列表
+        if isinstance(data, list):
+            return data, 0
+        return data['articles'], data.get('seq', 0)
+
+    def _bump(self):
+        """索引已变化：进入新版本，旧版本的视图仍由持有它的读者继续使用"""
+        self.version += 1
+        self._view = None
+
+    def _replay(self, data, snapshot_seq):
+        """回放日志中的完整行，返回消费掉的字节数；末尾不完整的行留待下次处理"""
+        self._bump()
+        consumed = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            consumed += len(line)
+            if not line.strip():
+                continue
+            try:
+                entry = serializer.loads(line)
+            except ValueError:
+                print(f"跳过损坏的日志记录: {line[:80]!r}")
+                continue
+            if entry.get('seq', 0) <= snapshot_seq:
+                continue
+            _apply_mutation(self._index, entry)
+            self.seq = max(self.seq, entry['seq'])
+            self.journal_entries += 1
+        return consumed
+
+    def _reload(self, snapshot_key):
+        articles, snapshot_seq = self._read_snapshot()
+        self._bump()
+        self._index = ArticleIndex(articles)
+        self.seq = snapshot_seq
+        self.journal_entries = 0
+        self._snapshot_key = snapshot_key
+        try:
+            with open(self.journal_path, 'rb') as f:
+                self._journal_ino = os.fstat(f.fileno()).st_ino
+                self._journal_offset = self._replay(f.read(), snapshot_seq)
+        except FileNotFoundError:
+            self._journal_ino = None
+            self._journal_offset = 0
+        self._snapshot_seq = snapshot_seq
+
+    def _refresh(self):
+        """确保缓存与磁盘一致（调用方持有锁）"""
+        snapshot_key = _file_key(self.snapshot_path)
+        journal_key = _file_key(self.journal_path)
+        journal_ino = journal_key[2] if journal_key else None
+        journal_size = journal_key[1] if journal_key else 0
+
+        if (self._index is not None and snapshot_key == self._snapshot_key
+                and journal_ino == self._journal_ino and journal_size >= self._journal_offset):
+            if journal_size == self._journal_offset:
+                self.hits += 1
+                return
+            # 日志被追加：只回放新增部分
+            with open(self.journal_path, 'rb') as f:
+                f.seek(self._journal_offset)
+                self._journal_offset += self._replay(f.read(), self._snapshot_seq)
+            self.replays += 1
+            return
+
+        self.misses += 1
+        self._reload(snapshot_key)
+
+    def _stale(self):
+        """不加锁地快速判断磁盘文件是否已变化"""
+        if self._index is None or _file_key(self.snapshot_path) != self._snapshot_key:
+            return True
+        journal_key = _file_key(self.journal_path)
+        if journal_key is None:
+            return self._journal_ino is not None
+        return journal_key[2] != self._journal_ino or journal_key[1] != self._journal_offset
+
+    @contextlib.contextmanager
+    def _synced(self):
+        """与磁盘同步后在持有self._lock的状态下执行
+
+        需要重新读取文件时，先于self._lock取得跨进程共享锁，避免读到其他进程写了一半的状态；
+        缓存命中时不涉及文件锁。
+        """
+        held = self.file_lock is not None and self._stale() and self.file_lock.acquire_shared()
+        try:
+            with self._lock:
+                self._refresh()
+                yield
+        finally:
+            if held:
+                self.file_lock.release_shared()
+
+    def view(self):
+        """返回当前版本的只读视图 (版本号, 按展示顺序的元数据元组, id → 元数据)
+
+        同一版本只构建一次；元数据记录在版本之间共享，调用方不得修改。
+        """
+        with self._synced():
+            if self._view is None:
+                self._view = (self.version, tuple(self._index.ordered()), dict(self._index.records))
+            return self._view
+
+    def get(self):
+        """返回文章列表快照（每条记录为浅拷贝，调用方可自由修改）"""
+        _, articles, _ = self.view()
+        # 在锁外复制，不阻塞写入
+        return [dict(article) for article in articles]
+
+    def get_article(self, article_id):
+        """按ID返回单篇文章元数据的拷贝，不存在时返回None"""
+        with self._synced():
+            article = self._index.get(article_id)
+            return dict(article) if article is not None else None
+
+    def between(self, start=None, end=None, limit=None):
+        """按日期范围返回元数据拷贝，新的在前"""
+        with self._synced():
+            return [dict(self._index.records[article_id])
+                    for article_id in self._index.ids_between(start, end, limit)]
+
+    def page(self, after=None, limit=None, match=None):
+        """按展示顺序分页返回元数据拷贝和是否还有更多"""
+        with self._synced():
+            page, more = self._index.page(after, limit, match)
+            return [dict(meta) for meta in page], more
+
+    def data_seq(self):
+        """与磁盘同步后的最新日志序号"""
+        with self._synced():
+            return self.seq
+
+    def content_refcount(self, digest):
+        """引用该正文摘要的文章数"""
+        with self._synced():
+            return self._index.content_refs.get(digest, 0)
+
+    def content_keys(self):
+        """所有文章引用的正文键（正文摘要，旧记录为文章ID）"""
+        with self._synced():
+            return {meta.get('content_sha256') or article_id
+                    for article_id, meta in self._index.records.items()}
+
+    def refresh(self):
+        """只同步磁盘上的变化，不复制数据"""
+        with self._synced():
+            pass
+
+    def journal_has_partial_line(self):
+        """日志末尾是否残留崩溃时写了一半的记录"""
+        journal_key = _file_key(self.journal_path)
+        return journal_key is not None and journal_key[1] > self._journal_offset
+
+    def applied(self, entries, journal_offset):
+        """本进程追加日志后，直接把变更应用到缓存"""
+        with self._lock:
+            self._bump()
+            for entry in entries:
+                _apply_mutation(self._index, entry)
+                self.seq = entry['seq']
+                self.journal_entries += 1
+            self._journal_ino = _file_key(self.journal_path)[2]
+            self._journal_offset = journal_offset
+
+    def put(self, articles, seq):
+        """写入新快照并清空日志后，用最新数据填充缓存"""
+        with self._lock:
+            self._bump()
+            self._index = ArticleIndex(articles)
+            self.seq = seq
+            self._snapshot_seq = seq
+            self.journal_entries = 0
+            self._snapshot_key = _file_key(self.snapshot_path)
+            journal_key = _file_key(self.journal_path)
+            self._journal_ino = journal_key[2] if journal_key else None
+            self._journal_offset = journal_key[1] if journal_key else 0
+
+    def invalidate(self):
+        """清空缓存"""
+        with self._lock:
+            self._snapshot_key = None
+            self._index = None
+            self._view = None
+
+    def stats(self):
+        """缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.replays + self.misses
+            return {
+                'hits': self.hits,
+                'replays': self.replays,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'cached': self._index is not None,
+                'cached_articles': len(self._index) if self._index is not None else 0
+            }
+
+
+def _split_article(article):
+    """拆分为元数据和正文，正文不存在时返回None"""
+    meta = {key: value for key, value in article.items() if key != 'content'}
+    return meta, article.get('content')
+
+
+def content_digest(content):
+    """正文的SHA-256摘要，作为正文blob的存储键"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _content_key(meta):
+    """文章正文的存储键：正文摘要；尚未迁移的旧记录沿用文章ID"""
+    return meta.get('content_sha256') or meta['id']
+
+
+def _safe_filename(key):
+    """可直接作为文件名的键原样使用，否则取SHA-1"""
+    if _SAFE_ID_PATTERN.match(key):
+        return key
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+# 正文按标签结尾和换行切分为差量比较的单位
+_DELTA_SPLIT_PATTERN = re.compile(r'(?<=[>\n])')
+
+
+def content_delta(new, old):
+    """计算把新正文还原为旧正文的差量
+
+    差量是一组操作：[起, 止] 表示复制新正文的第起~止个分块，字符串表示插入旧正文中的这段内容；
+    大小与两次正文之间实际变化的部分成正比。
+    """
+    new_chunks, old_chunks = _DELTA_SPLIT_PATTERN.split(new), _DELTA_SPLIT_PATTERN.split(old)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, new_chunks, old_chunks).get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(old_chunks[j1:j2]))
+    return ops
+
+
+def apply_delta(new, ops):
+    """用差量从新正文还原出旧正文"""
+    chunks = _DELTA_SPLIT_PATTERN.split(new)
+    return ''.join(''.join(chunks[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+
+
+def _history_entry(old_meta, old_content, new_content):
+    """正文被替换时记录的历史版本：旧元数据（派生字段恢复时重新计算）和相对新正文的差量"""
+    return {
+        'saved_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'meta': {key: value for key, value in old_meta.items() if key not in DERIVED_FIELDS},
+        'base_sha256': content_digest(new_content),
+        'delta': content_delta(new_content, old_content)
+    }
+
+
+def _pack_delta(ops):
+    return _pack_content(serializer.dumps_str(ops))
+
+
+def _unpack_delta(data):
+    return serializer.loads(_unpack_content(data))
+
+
+def _matches(article, source=None, tag=None):
+    """判断文章是否满足来源/标签过滤条件"""
+    if source is not None and article.get('source') != source:
+        return False
+    if tag is not None and tag not in (article.get('tags') or []):
+        return False
+    return True
+
+
+class ShardContentStore:
+    """正文分片存储：每篇文章一个文件 content/<id>.html"""
+
+    backend = 'files'
+
+    def __init__(self, content_dir=CONTENT_DIR):
+        self.content_dir = content_dir
+
+    def _path(self, key):
+        """正文分片的文件路径"""
+        return os.path.join(self.content_dir, f"{_safe_filename(key)}.html")
+
+    def exists(self):
+        return os.path.isdir(self.content_dir)
+
+    def contains(self, key):
+        return os.path.exists(self._path(key))
+
+    def get_raw(self, key):
+        """读取存储字节（可能已压缩），不存在时返回空字节串"""
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return b''
+
+    def get(self, key):
+        """读取并解压正文，不存在时返回空字符串"""
+        return _unpack_content(self.get_raw(key))
+
+    def put_many(self, items):
+        """压缩并写入 [(key, content), ...]，返回写入字节数"""
+        written = 0
+        for key, content in items:
+            written += _atomic_write(self._path(key), _pack_content(content))
+        return written
+
+    def remove_many(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def retain(self, keys):
+        """删除不在keys中的正文分片（包括崩溃残留的临时文件），返回删除数量"""
+        if not os.path.isdir(self.content_dir):
+            return 0
+        live_files = {os.path.basename(self._path(key)) for key in keys}
+        removed = 0
+        for filename in os.listdir(self.content_dir):
+            if filename not in live_files:
+                os.remove(os.path.join(self.content_dir, filename))
+                removed += 1
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.content_dir, ignore_errors=True)
+
+    def stats(self):
+        return {'backend': self.backend}
+
+
+class MmapContentStore:
+    """内存映射的正文存储
+
+    content-<n>.blob   所有正文依次追加的存储字节（压缩或UTF-8），只追加不修改
+    content.table      偏移表，首行为 {"blob": 文件名}，之后每行 [key, offset, length]，
+                       同一key以最后一行为准，length为-1表示已删除
+
+    读取时只把blob以只读方式映射进内存，按偏移切出单篇正文再解压解码，
+    不会读取或解码其他文章；映射走操作系统页缓存，多个worker进程共享同一份物理内存。
+    已删除/被覆盖的字节超过存活字节时，retain()会把存活正文重写到新一代blob，
+    再原子替换偏移表，旧映射在关闭前依然有效。
+    """
+
+    backend = 'mmap'
+
+    # 失效字节超过该大小且超过存活字节时重写blob
+    REWRITE_MIN_DEAD_BYTES = 1024 * 1024
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.table_file = os.path.join(store_dir, 'content.table')
+        self._lock = threading.RLock()
+        self._table = {}
+        self._blob_name = None
+        self._table_key = None
+        self._table_offset = 0
+        self._live_bytes = 0
+        self._dead_bytes = 0
+        self._mmap = None
+        self._mapped_name = None
+        self.reads = 0
+        self.remaps = 0
+
+    def exists(self):
+        return os.path.exists(self.table_file)
+
+    def contains(self, key):
+        with self._lock:
+            self._refresh_table()
+            return key in self._table
+
+    def _blob_path(self, name=None):
+        return os.path.join(self.store_dir, name or self._blob_name)
+
+    def _reset_table(self):
+        self._table = {}
+        self._blob_name = None
+        self._table_offset = 0
+        self._live_bytes = 0
+        self._dead_bytes = 0
+
+    def _apply_record(self, record):
+        key, offset, length = record
+        previous = self._table.pop(key, None)
+        if previous is not None:
+            self._live_bytes -= previous[1]
+            self._dead_bytes += previous[1]
+        if length >= 0:
+            self._table[key] = (offset, length)
+            self._live_bytes += length
+
+    def _refresh_table(self):
+        """偏移表有变化时只读取新追加的部分；文件被替换或截断时整体重读（调用方持有锁）"""
+        key = _file_key(self.table_file)
+        if key == self._table_key:
+            return
+        if key is None:
+            self._reset_table()
+            self._table_key = None
+            return
+        if self._table_key is None or key[2] != self._table_key[2] or key[1] < self._table_offset:
+            self._reset_table()
+
+        with open(self.table_file, 'rb') as f:
+            f.seek(self._table_offset)
+            data = f.read()
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            self._table_offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = serializer.loads(line)
+            except ValueError:
+                print(f"跳过损坏的偏移表记录: {line[:80]!r}")
+                continue
+            if isinstance(record, dict):
+                self._blob_name = record['blob']
+            else:
+                self._apply_record(record)
+        self._table_key = key
+
+    def _map(self, end):
+        """保证映射覆盖到end字节处，blob被追加或换代后重新映射（调用方持有锁）"""
+        if self._mmap is not None and self._mapped_name == self._blob_name and len(self._mmap) >= end:
+            return
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        with open(self._blob_path(), 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped_name = self._blob_name
+        self.remaps += 1
+
+    def get_raw(self, key):
+        """从映射中切出单篇正文的存储字节（可能已压缩），不存在时返回空字节串"""
+        with self._lock:
+            self._refresh_table()
+            location = self._table.get(key)
+            if not location or not location[1]:
+                return b''
+            offset, length = location
+            self._map(offset + length)
+            self.reads += 1
+            return self._mmap[offset:offset + length]
+
+    def get(self, key):
+        """读取并解压单篇正文，不存在时返回空字符串"""
+        return _unpack_content(self.get_raw(key))
+
+    def _append_table(self, records):
+        """追加偏移表记录并fsync（调用方持有锁）"""
+        data = b''.join(serializer.dumps(record) + b'\n' for record in records)
+        with open(self.table_file, 'ab+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    # 上次崩溃残留了半行，先补换行使其成为可跳过的独立坏行
+                    data = b'\n' + data
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._refresh_table()
+
+    def _write_table(self, blob_name, records):
+        """原子重写整个偏移表（调用方持有锁）"""
+        lines = [serializer.dumps({'blob': blob_name}) + b'\n']
+        lines.extend(serializer.dumps(record) + b'\n' for record in records)
+        _atomic_write(self.table_file, b''.join(lines))
+        self._refresh_table()
+
+    def put_many(self, items):
+        """把正文依次追加到blob并fsync，再追加偏移表记录，返回写入字节数"""
+        if not items:
+            return 0
+        with self._lock:
+            self._refresh_table()
+            if self._blob_name is None:
+                self._write_table('content-1.blob', [])
+            records = []
+            with open(self._blob_path(), 'ab') as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                for key, content in items:
+                    data = _pack_content(content)
+                    f.write(data)
+                    records.append([key, offset, len(data)])
+                    offset += len(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # blob落盘后再发布偏移，偏移表中不会出现指向未写入数据的记录
+            self._append_table(records)
+            return sum(record[2] for record in records)
+
+    def remove_many(self, keys):
+        with self._lock:
+            self._refresh_table()
+            records = [[key, 0, -1] for key in keys if key in self._table]
+            if records:
+                self._append_table(records)
+
+    def retain(self, keys):
+        """删除不在keys中的正文，失效字节过多时重写blob，返回删除数量"""
+        keys = set(keys)
+        with self._lock:
+            self._refresh_table()
+            removed = [key for key in self._table if key not in keys]
+            self.remove_many(removed)
+            if (self._dead_bytes >= self.REWRITE_MIN_DEAD_BYTES
+                    and self._dead_bytes > self._live_bytes):
+                self._rewrite()
+            self._remove_stale_blobs()
+            return len(removed)
+
+    def _rewrite(self):
+        """把存活正文按原顺序复制到新一代blob，再原子切换偏移表（调用方持有锁）"""
+        generation = int(re.search(r'(\d+)', self._blob_name).group(1)) + 1
+        new_name = f"content-{generation}.blob"
+        records = []
+        entries = sorted(self._table.items(), key=lambda item: item[1][0])
+        with open(self._blob_path(new_name), 'wb') as f:
+            offset = 0
+            for key, (old_offset, length) in entries:
+                if length:
+                    self._map(old_offset + length)
+                    f.write(self._mmap[old_offset:old_offset + length])
+                records.append([key, offset, length])
+                offset += length
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(self._blob_path(new_name), 0o644)
+        self._write_table(new_name, records)
+        # 释放旧一代blob的映射，下次读取时映射新文件；
+        # 没有存活正文时从未映射过，新一代blob为空文件、偏移表只剩头行
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._mapped_name = None
+
+    def _remove_stale_blobs(self):
+        """删除已被换代或重写中途崩溃残留的blob（调用方持有锁）"""
+        for filename in os.listdir(self.store_dir):
+            if (filename.startswith('content-') and filename.endswith('.blob')
+                    and filename != self._blob_name):
+                os.remove(os.path.join(self.store_dir, filename))
+
+    def clear(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._blob_name = None
+            self._remove_stale_blobs()
+            try:
+                os.remove(self.table_file)
+            except FileNotFoundError:
+                pass
+            self._refresh_table()
+
+    def stats(self):
+        with self._lock:
+            self._refresh_table()
+            blob_key = _file_key(self._blob_path()) if self._blob_name else None
+            return {
+                'backend': self.backend,
+                'blob': self._blob_name,
+                'entries': len(self._table),
+                'live_bytes': self._live_bytes,
+                'dead_bytes': self._dead_bytes,
+                'blob_bytes': blob_key[1] if blob_key else 0,
+                'mapped_bytes': len(self._mmap) if self._mmap is not None else 0,
+                'reads': self.reads,
+                'remaps': self.remaps
+            }
+
+
+class HistoryLog:
+    """json引擎的文章历史版本：每篇文章一个只追加的JSON行文件 history/<id>.jsonl
+
+    每行一个版本 {"version", "saved_at", "meta", "base_sha256", "delta"}，
+    delta为压缩后的差量（base64）；超过limit个版本时丢弃最旧的。
+    """
+
+    def __init__(self, history_dir, limit=HISTORY_LIMIT):
+        self.history_dir = history_dir
+        self.limit = limit
+
+    def _path(self, article_id):
+        return os.path.join(self.history_dir, f"{_safe_filename(article_id)}.jsonl")
+
+    def entries(self, article_id):
+        """按版本号从旧到新返回历史版本，delta已解码为操作列表"""
+        try:
+            with open(self._path(article_id), 'rb') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entry = serializer.loads(line)
+            except ValueError:
+                # 崩溃时写了一半的行
+                continue
+            entry['delta'] = _unpack_delta(base64.b64decode(entry['delta']))
+            entries.append(entry)
+        return entries
+
+    def append(self, article_id, entry):
+        """追加一个历史版本并fsync，返回版本号（调用方持有写锁）"""
+        entries = self.entries(article_id)
+        entry = dict(entry, version=entries[-1]['version'] + 1 if entries else 1)
+        encoded = dict(entry, delta=base64.b64encode(_pack_delta(entry['delta'])).decode('ascii'))
+        path = self._path(article_id)
+        if len(entries) >= self.limit:
+            # 超出保留数量时整体重写，只保留最新的版本
+            kept = [dict(item, delta=base64.b64encode(_pack_delta(item['delta'])).decode('ascii'))
+                    for item in entries[len(entries) - self.limit + 1:]]
+            _atomic_write(path, b''.join(serializer.dumps(item) + b'\n' for item in kept + [encoded]))
+        else:
+            os.makedirs(self.history_dir, exist_ok=True)
+            with open(path, 'ab') as f:
+                f.write(serializer.dumps(encoded) + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+        return entry['version']
+
+    def remove_many(self, article_ids):
+        for article_id in article_ids:
+            try:
+                os.remove(self._path(article_id))
+            except FileNotFoundError:
+                pass
+
+    def retain(self, article_ids):
+        """删除已不存在的文章的历史，返回删除的文件数"""
+        if not os.path.isdir(self.history_dir):
+            return 0
+        live_files = {os.path.basename(self._path(article_id)) for article_id in article_ids}
+        removed = 0
+        for filename in os.listdir(self.history_dir):
+            if filename not in live_files:
+                os.remove(os.path.join(self.history_dir, filename))
+                removed += 1
+        return removed
+
+
+def _content_store(store_dir, backend):
+    """按名称创建正文存储"""
+    if backend == 'mmap':
+        return MmapContentStore(store_dir)
+    return ShardContentStore(os.path.join(store_dir, 'content'))
+
+
+class ContentTiers:
+    """正文的冷热分层缓存
+
+    热层：按日期最新的hot_articles篇（以及最近hot_weeks周内）文章的正文，首次读取后常驻内存；
+    冷层：其余正文留在压缩存储中，按需解压后放入LRU，总占用超过cold_budget时淘汰最久未用的。
+    正文按摘要寻址、内容不可变，缓存项不会过期，只需在文章集合变化时重新划分热层。
+    """
+
+    def __init__(self, hot_articles=HOT_ARTICLES, hot_weeks=HOT_WEEKS, cold_budget=COLD_CACHE_BYTES):
+        self.hot_articles = hot_articles
+        self.hot_weeks = hot_weeks
+        self.cold_budget = cold_budget
+        # 划分热层时文章集合的版本标识
+        self.version = None
+        self._lock = threading.Lock()
+        self._hot_digests = frozenset()
+        self._hot = {}
+        self._cold = collections.OrderedDict()
+        self._cold_bytes = 0
+        self._stats = {'hot_hits': 0, 'cold_hits': 0, 'loads': 0, 'evictions': 0, 'retiers': 0}
+
+    def hot_cutoff(self):
+        """最近hot_weeks周的起始日期，未设置hot_weeks时为None"""
+        if not self.hot_weeks:
+            return None
+        return (datetime.date.today() - datetime.timedelta(weeks=self.hot_weeks)).isoformat()
+
+    def select_hot(self, newest_first):
+        """从按日期新的在前排列的元数据中选出热层文章的正文摘要，超出热层范围即停止读取"""
+        cutoff = self.hot_cutoff()
+        hot = set()
+        for position, meta in enumerate(newest_first):
+            if position >= self.hot_articles and (cutoff is None or (meta.get('date') or '') < cutoff):
+                break
+            hot.add(meta.get('content_sha256'))
+        return hot - {None}
+
+    def retier(self, version, newest_first):
+        """文章集合变化后重新划分热层：移出热层的正文降入冷层LRU，冷层中已缓存的升入热层"""
+        digests = self.select_hot(newest_first)
+        with self._lock:
+            for digest in [digest for digest in self._hot if digest not in digests]:
+                self._admit_cold(digest, self._hot.pop(digest))
+            for digest in digests & self._cold.keys():
+                content = self._cold.pop(digest)
+                self._cold_bytes -= sys.getsizeof(content)
+                self._hot[digest] = content
+            self._hot_digests = frozenset(digests)
+            self.version = version
+            self._stats['retiers'] += 1
+
+    def _admit_cold(self, digest, content):
+        """放入冷层LRU并按内存上限淘汰（调用方持有锁）"""
+        size = sys.getsizeof(content)
+        if digest in self._cold:
+            self._cold.move_to_end(digest)
+            return
+        if size > self.cold_budget:
+            return
+        self._cold[digest] = content
+        self._cold_bytes += size
+        while self._cold_bytes > self.cold_budget:
+            _, evicted = self._cold.popitem(last=False)
+            self._cold_bytes -= sys.getsizeof(evicted)
+            self._stats['evictions'] += 1
+
+    def get(self, digest, loader, admit=True):
+        """读取正文，未缓存时调用loader()从存储读取
+
+        admit=False 用于导出等全量遍历：冷层正文读取后不放入LRU，避免把常用正文挤出缓存。
+        """
+        with self._lock:
+            content = self._hot.get(digest)
+            if content is not None:
+                self._stats['hot_hits'] += 1
+                return content
+            content = self._cold.get(digest)
+            if content is not None:
+                self._cold.move_to_end(digest)
+                self._stats['cold_hits'] += 1
+                return content
+        # 在锁外读取和解压
+        content = loader()
+        with self._lock:
+            self._stats['loads'] += 1
+            if content and digest in self._hot_digests:
+                self._hot[digest] = content
+            elif content and admit:
+                self._admit_cold(digest, content)
+        return content
+
+    def clear(self):
+        with self._lock:
+            self._hot.clear()
+            self._cold.clear()
+            self._cold_bytes = 0
+            self.version = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats['hot_hits'] + stats['cold_hits'] + stats['loads']
+            stats.update({
+                'hot_articles': self.hot_articles,
+                'hot_weeks': self.hot_weeks,
+                'hot_entries': len(self._hot),
+                'hot_bytes': sum(sys.getsizeof(content) for content in self._hot.values()),
+                'cold_entries': len(self._cold),
+                'cold_bytes': self._cold_bytes,
+                'cold_budget': self.cold_budget,
+                'hit_rate': round((lookups - stats['loads']) / lookups, 3) if lookups else 0.0
+            })
+            return stats
+
+
+class ArticleSnapshot:
+    """固定在某一版本的只读文章视图
+
+        with get_store().snapshot() as snapshot:
+            for article in snapshot:
+                content = snapshot.get_content(article['id'])
+
+    写入方发布新版本不会影响已创建的快照，遍历时不持有任何锁。
+    元数据记录在版本之间共享，不可修改，需要修改时用 list() 取得副本；
+    快照引用的正文在最后一个读者释放该版本之前不会被回收。
+    """
+
+    def __init__(self, store, version, articles, by_id):
+        self.version = version
+        self._store = store
+        self._articles = articles
+        self._by_id = by_id
+        self._released = False
+        # 按 (日期, 展示顺序) 排列的元数据及对应日期，首次按日期查询时构建
+        self._by_date = None
+        self._dates = None
+
+    def __iter__(self):
+        return iter(self._articles)
+
+    def __len__(self):
+        return len(self._articles)
+
+    def get(self, article_id):
+        """按ID返回元数据（只读），不存在时返回None"""
+        return self._by_id.get(article_id)
+
+    def list(self, with_content=False):
+        """返回元数据副本列表，with_content=True 时填入该版本的正文"""
+        articles = [dict(article) for article in self._articles]
+        if with_content:
+            for article in articles:
+                article['content'] = self._store._read_content(article, admit=False)
+        return articles
+
+    def articles(self, by_date=False):
+        """返回该版本的Article模型列表，正文在访问article.content时才读取
+
+        by_date=True 时按日期排列（新的在前，同一天按展示顺序）。
+        """
+        metas = self._date_range(None, None, None) if by_date else self._articles
+        return [Article.from_dict(meta, self.get_content) for meta in metas]
+
+    def between(self, start=None, end=None, limit=None):
+        """日期在[start, end]内的元数据副本，新的在前，最多limit篇"""
+        return [dict(meta) for meta in self._date_range(start, end, limit)]
+
+    def _date_range(self, start, end, limit):
+        if self._by_date is None:
+            # _articles按展示顺序（新的在前），倒序后稳定排序即得同一天内旧的在前
+            self._by_date = sorted(reversed(self._articles), key=lambda meta: meta.get('date') or '')
+            self._dates = [meta.get('date') or '' for meta in self._by_date]
+        lo = 0 if start is None else bisect.bisect_left(self._dates, start)
+        hi = len(self._dates) if end is None else bisect.bisect_right(self._dates, end)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return self._by_date[lo:hi][::-1]
+
+    def get_content(self, article_id):
+        """读取该版本下文章的正文，不存在时返回空字符串"""
+        meta = self._by_id.get(article_id)
+        return self._store._read_content(meta) if meta is not None else ''
+
+    def release(self):
+        """释放快照；版本的最后一个读者释放后，该版本独有的正文才可回收"""
+        if not self._released:
+            self._released = True
+            self._store._unpin(self.version)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class Transaction:
+    """一组变更命令，commit时作为一个整体提交：一次读取、一次持久化写入
+
+        with get_writer().begin() as txn:
+            txn.upsert_many(articles)
+            txn.delete(article_id)
+
+    with块正常结束时提交，块内抛出异常时丢弃；提交后各命令的结果见 results。
+    """
+
+    def __init__(self, commit_func):
+        self._commit_func = commit_func
+        self.commands = []
+        self.results = None
+        self.closed = False
+
+    def _add(self, command):
+        if self.closed:
+            raise RuntimeError('事务已结束')
+        self.commands.append(command)
+
+    def upsert(self, article):
+        self._add(('upsert', article))
+
+    def update(self, article_id, fields):
+        self._add(('update', article_id, fields))
+
+    def delete(self, article_id):
+        self._add(('delete', article_id))
+
+    def upsert_many(self, articles):
+        for article in articles:
+            self.upsert(article)
+
+    def delete_many(self, article_ids):
+        for article_id in article_ids:
+            self.delete(article_id)
+
+    def commit(self):
+        """提交全部命令，返回每条命令的结果"""
+        if self.closed:
+            raise RuntimeError('事务已结束')
+        self.closed = True
+        self.results = self._commit_func(self.commands) if self.commands else []
+        return self.results
+
+    def rollback(self):
+        """丢弃尚未提交的命令"""
+        self.closed = True
+        self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.rollback()
+        elif not self.closed:
+            self.commit()
+        return False
+
+
+class ArticleStore:
+    """文章存储接口
+
+    所有引擎的文章顺序与原articles.json一致：新文章排在最前，更新文章保持原位置。
+    写操作失败时抛出异常，由调用方决定如何反馈。
+    长时间的读取（周报生成、网站构建）应使用 snapshot() 取得固定版本的一致视图。
+    """
+
+    engine = None
+
+    def __init__(self):
+        # 被读者固定的版本：version → [id → 元数据, 读者数]
+        self._pins = {}
+        self._pin_lock = threading.Lock()
+        # 因被快照引用而推迟删除的正文摘要
+        self._deferred_blobs = set()
+        # 最后一个快照释放后请求回收推迟删除的正文，由写线程注册（回收在写线程中执行）；
+        # 未注册时留给下一次gc()
+        self.request_collect = None
+        self._snapshot_stats = {'snapshots': 0, 'released_versions': 0}
+        self._tiers = ContentTiers()
+
+    def _view(self):
+        """当前版本的 (版本号, 按展示顺序的元数据元组, id → 元数据)"""
+        raise NotImplementedError
+
+    def _load_content(self, meta):
+        """按元数据引用的正文键从存储读取正文"""
+        raise NotImplementedError
+
+    def _tier_version(self):
+        """文章集合的版本标识，变化时重新划分正文热层"""
+        return self._view()[0]
+
+    def _tier_articles(self):
+        """划分正文热层所需的元数据：按日期最新的hot_articles篇及最近hot_weeks周内的文章，新的在前
+
+        经日期索引读取，写入后重新划分热层时不必排序全部文章
+        """
+        limit = self._tiers.hot_articles
+        cutoff = self._tiers.hot_cutoff()
+        if cutoff is not None:
+            recent = self.articles_between(start=cutoff)
+            if len(recent) >= limit:
+                return recent
+        return self.articles_between(limit=limit)
+
+    def _read_content(self, meta, admit=True):
+        """经冷热分层缓存读取正文"""
+        digest = meta.get('content_sha256')
+        if not digest:
+            return self._load_content(meta)
+        version = self._tier_version()
+        if version != self._tiers.version:
+            self._tiers.retier(version, self._tier_articles())
+        return self._tiers.get(digest, lambda: self._load_content(meta), admit)
+
+    def snapshot(self):
+        """固定当前版本并返回只读快照，用完后须 release()（或使用with）"""
+        version, articles, by_id = self._view()
+        with self._pin_lock:
+            pin = self._pins.setdefault(version, [by_id, 0])
+            pin[1] += 1
+            self._snapshot_stats['snapshots'] += 1
+        return ArticleSnapshot(self, version, articles, by_id)
+
+    def _unpin(self, version):
+        with self._pin_lock:
+            pin = self._pins[version]
+            pin[1] -= 1
+            if pin[1] > 0:
+                return
+            del self._pins[version]
+            self._snapshot_stats['released_versions'] += 1
+        # 读者线程只提交回收请求，不在这里删除文件
+        if self._deferred_blobs and self.request_collect is not None:
+            self.request_collect()
+
+    def _pinned_digests(self):
+        """仍被快照引用的正文摘要"""
+        with self._pin_lock:
+            views = [by_id for by_id, _ in self._pins.values()]
+        return {meta.get('content_sha256') for by_id in views for meta in by_id.values()} - {None}
+
+    def collect_deferred(self):
+        """回收推迟删除、且已不再被任何快照引用的正文（应在写线程中调用）"""
+
+    def snapshot_stats(self):
+        with self._pin_lock:
+            stats = dict(self._snapshot_stats)
+            stats['pinned_versions'] = sorted(self._pins)
+            stats['readers'] = sum(readers for _, readers in self._pins.values())
+            stats['deferred_blobs'] = len(self._deferred_blobs)
+            return stats
+
+    def list_articles(self, with_content=False, source=None, tag=None):
+        """按顺序返回文章列表，默认只含元数据"""
+        raise NotImplementedError
+
+    def get_article(self, article_id, with_content=False):
+        """按ID获取单篇文章，不存在时返回None"""
+        raise NotImplementedError
+
+    def get_content(self, article_id):
+        """读取单篇文章正文，不存在时返回空字符串"""
+        raise NotImplementedError
+
+    def articles_between(self, start=None, end=None, limit=None):
+        """日期在[start, end]内（YYYY-MM-DD，含两端，None表示不限）的文章元数据，
+        按日期新的在前（同一天按展示顺序），最多limit篇"""
+        raise NotImplementedError
+
+    def page_articles(self, limit=None, after=None, source=None, tag=None):
+        """按展示顺序分页返回元数据，返回 (文章列表, 下一页游标)
+
+        after为上一页返回的游标（该页最后一篇的文章ID），没有更多文章时下一页游标为None；
+        游标对应的文章已不存在时抛出ValueError
+        """
+        raise NotImplementedError
+
+    def latest_articles(self, limit):
+        """按日期最新的limit篇文章元数据"""
+        return self.articles_between(limit=limit)
+
+    def articles_in_week(self, year, week):
+        """ISO周（周一至周日）内的文章元数据"""
+        return self.articles_between(*iso_week_range(year, week))
+
+    def _history_entries(self, article_id):
+        """文章的历史版本，按版本号从旧到新，每项含version/saved_at/meta/base_sha256/delta"""
+        raise NotImplementedError
+
+    def history(self, article_id):
+        """文章的历史版本摘要，最新的在前"""
+        return [{
+            'version': entry['version'],
+            'saved_at': entry['saved_at'],
+            'title': entry['meta'].get('title'),
+            'date': entry['meta'].get('date'),
+            'content_sha256': entry['meta'].get('content_sha256'),
+            'delta_bytes': len(_pack_delta(entry['delta']))
+        } for entry in reversed(self._history_entries(article_id))]
+
+    def get_version(self, article_id, version):
+        """还原文章的某个历史版本（含正文），版本不存在或差量链不完整时返回None
+
+        从当前正文开始，按版本号从新到旧逐个应用差量；每一步先核对差量所基于的正文摘要。
+        """
+        entries = [entry for entry in self._history_entries(article_id) if entry['version'] >= version]
+        if not entries or entries[0]['version'] != version:
+            return None
+        content = self.get_content(article_id)
+        for entry in reversed(entries):
+            if content_digest(content) != entry['base_sha256']:
+                print(f"文章 {article_id} 的历史版本 {entry['version']} 与后续正文不连续")
+                return None
+            content = apply_delta(content, entry['delta'])
+        return dict(entries[0]['meta'], content=content)
+
+    def apply_batch(self, commands):
+        """按顺序执行一批变更并一次性持久化，返回每条命令的结果
+
+        命令格式：('upsert', article)、('update', article_id, fields)、('delete', article_id)，
+        以及 ('transaction', [命令, ...])：其中的命令整体生效，结果为各条命令结果的列表
+        """
+        raise NotImplementedError
+
+    def begin(self):
+        """开始一个事务，commit时整体写入"""
+        return Transaction(lambda commands: self.apply_batch([('transaction', commands)])[0])
+
+    def upsert_many(self, articles):
+        """批量新增或替换文章（一次读取、一次写入），返回每篇是否为新增"""
+        with self.begin() as txn:
+            txn.upsert_many(articles)
+        return txn.results
+
+    def delete_many(self, article_ids):
+        """批量删除文章，返回每篇被删除文章的元数据（不存在时为None）"""
+        with self.begin() as txn:
+            txn.delete_many(article_ids)
+        return txn.results
+
+    def upsert_article(self, article):
+        """新增或整体替换文章，返回是否为新增"""
+        return self.apply_batch([('upsert', article)])[0]
+
+    def update_article(self, article_id, fields):
+        """部分更新文章元数据，返回更新后的元数据，文章不存在时返回None"""
+        return self.apply_batch([('update', article_id, fields)])[0]
+
+    def delete_article(self, article_id):
+        """删除文章，返回被删除文章的元数据，文章不存在时返回None"""
+        return self.apply_batch([('delete', article_id)])[0]
+
+    def replace_all(self, articles):
+        """用给定列表整体替换存储内容（不带content的记录保留原正文）"""
+        raise NotImplementedError
+
+    def gc(self):
+        """删除没有任何文章引用的正文，返回删除数量"""
+        raise NotImplementedError
+
+    def _stored_bodies(self):
+        """逐个返回每份正文的存储字节（可能已压缩）"""
+        raise NotImplementedError
+
+    def recompress(self):
+        """按当前压缩配置重新编码已有正文，返回重写的正文数"""
+        raise NotImplementedError
+
+    def content_report(self):
+        """正文压缩效果：磁盘上的存储字节与原始UTF-8字节，以及全部正文载入内存时的占用"""
+        report = {
+            'compression': CONTENT_COMPRESSION or 'none',
+            'bodies': 0,
+            'raw_bytes': 0,
+            'stored_bytes': 0,
+            'memory_decoded_bytes': 0,
+            'memory_stored_bytes': 0,
+            'codecs': {}
+        }
+        for stored in self._stored_bodies():
+            if isinstance(stored, str):
+                stored = stored.encode('utf-8')
+            content = _unpack_content(stored)
+            codec = _content_codec(stored) or 'none'
+            report['bodies'] += 1
+            report['raw_bytes'] += len(content.encode('utf-8'))
+            report['stored_bytes'] += len(stored)
+            # 正文以str载入时的实际内存占用（含中文时每字符2~4字节），对比保持压缩字节时的占用
+            report['memory_decoded_bytes'] += sys.getsizeof(content)
+            report['memory_stored_bytes'] += sys.getsizeof(stored)
+            report['codecs'][codec] = report['codecs'].get(codec, 0) + 1
+        report['ratio'] = round(report['stored_bytes'] / report['raw_bytes'], 3) if report['raw_bytes'] else 1.0
+        return report
+
+    def data_version(self):
+        """数据版本 (版本号, 最后修改时间戳)
+
+        版本号持久化在存储中，所有进程看到的值一致，每次有实际变更的写入都会递增，
+        可直接用作HTTP的ETag；读取时不加载文章数据。
+        """
+        raise NotImplementedError
+
+    def invalidate(self):
+        """丢弃进程内缓存"""
+        self._tiers.clear()
+
+    def stats(self):
+        """存储统计信息"""
+        return {'engine': self.engine}
+
+    def export_json(self, path=ARTICLES_FILE, articles=None, pretty=None, snapshot=None):
+        """导出包含正文的完整articles.json
+
+        默认紧凑输出；pretty=True（或 ARTICLE_JSON_PRETTY=1）时带缩进，便于人工diff。
+        传入snapshot时导出该快照对应的版本。
+        """
+        if articles is None:
+            if snapshot is not None:
+                articles = snapshot.list(with_content=True)
+            else:
+                articles = self.list_articles(with_content=True)
+        if pretty is None:
+            pretty = serializer.PRETTY_DEFAULT
+        _atomic_write(path, serializer.dumps(articles, pretty=pretty))
+
+
+class JsonArticleStore(ArticleStore):
+    """元数据索引 + 正文分片的JSON文件存储
+
+    变更（新增/更新/删除/改标签）以一行JSON追加到journal.log并fsync，
+    每次变更只写入这一行和对应的正文分片，而不是重写整个索引；
+    日志超过阈值后由后台线程压缩：把当前状态写入新的index.json（临时文件+原子rename），
+    再清空日志。快照记录其对应的日志序号，崩溃后重放时会跳过已包含在快照中的记录。
+    """
+
+    engine = 'json'
+
+    # 日志超过该大小时触发后台压缩
+    COMPACT_THRESHOLD_BYTES = 256 * 1024
+
+    def __init__(self, store_dir=STORE_DIR, content_backend=CONTENT_BACKEND):
+        super().__init__()
+        self.store_dir = store_dir
+        self.index_file = os.path.join(store_dir, 'index.json')
+        self.journal_file = os.path.join(store_dir, 'journal.log')
+        self._content = _content_store(store_dir, content_backend)
+        self._history = HistoryLog(os.path.join(store_dir, 'history'))
+        self._content_checked = False
+        # 跨进程锁：写入（读-改-写）持独占锁，从磁盘重新加载索引时持共享锁
+        self._file_lock = StoreLock(os.path.join(store_dir, 'store.lock'))
+        self._cache = ArticleCache(self.index_file, self.journal_file, self._file_lock)
+        # 同一进程内的读-改-写操作串行执行
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._write_stats = {
+            'batches': 0,
+            'mutations': 0,
+            'bytes_written': 0,
+            'last_batch_bytes': 0,
+            'compactions': 0,
+            'last_compaction_bytes': 0,
+            'unchanged_upserts': 0,
+            'deduplicated_bodies': 0,
+            'blobs_removed': 0,
+            'history_versions': 0
+        }
+
+    def _ensure_store(self):
+        """新布局不存在时从旧的articles.json迁移"""
+        if not os.path.exists(self.index_file) and os.path.exists(ARTICLES_FILE):
+            with self._lock, self._file_lock.exclusive():
+                if os.path.exists(self.index_file):
+                    return
+                articles = _read_articles_json(ARTICLES_FILE)
+                self.replace_all(articles)
+                print(f"📦 已迁移 {len(articles)} 篇文章到 {os.path.dirname(self.index_file)}")
+        if not self._content_checked:
+            self._ensure_content()
+
+    def _ensure_content(self):
+        """切换正文存储方式后从另一种方式导入已有正文，并把按文章ID存放的旧正文迁移为按摘要存放"""
+        with self._lock, self._file_lock.exclusive():
+            self._content_checked = True
+            if not os.path.exists(self.index_file):
+                return
+            if not self._content.exists():
+                other = _content_store(self.store_dir, 'files' if self._content.backend == 'mmap' else 'mmap')
+                if other.exists():
+                    keys = self._cache.content_keys()
+                    self._content.put_many([(key, other.get(key)) for key in keys])
+                    # 旧方式的正文已失效，删除以免切换回去时读到过期内容
+                    other.clear()
+                    print(f"📦 已将 {len(keys)} 份正文从 {other.backend} 导入 {self._content.backend} 存储")
+            self._migrate_content_keys()
+
+    def _migrate_content_keys(self):
+        """为缺少content_sha256的旧记录计算摘要，正文改为按摘要存放（调用方持有锁）"""
+        legacy = [meta for meta in self._cache.get() if not meta.get('content_sha256')]
+        if not legacy:
+            return
+        contents, entries, stored = [], [], set()
+        for meta in legacy:
+            content = self._content.get(meta['id'])
+            digest = content_digest(content)
+            if digest not in stored and not self._content.contains(digest):
+                contents.append((digest, content))
+                stored.add(digest)
+            entries.append({'op': 'update', 'id': meta['id'], 'fields': {'content_sha256': digest}})
+        self._append(entries, self._content.put_many(contents))
+        self._content.remove_many([meta['id'] for meta in legacy])
+        print(f"📦 已将 {len(legacy)} 篇正文迁移为按SHA-256摘要存储")
+
+    def _load_index(self):
+        self._ensure_store()
+        return self._cache.get()
+
+    def _write_snapshot(self, index, seq):
+        """原子写入快照并清空日志，返回写入字节数"""
+        data = serializer.dumps({'seq': seq, 'articles': index})
+        written = _atomic_write(self.index_file, data)
+        # 快照已包含全部日志记录，此时即使在清空日志前崩溃，重放时也会按序号跳过
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(0)
+                os.fsync(f.fileno())
+        self._cache.put(index, seq)
+        return written
+
+    def _append(self, entries, extra_bytes=0):
+        """一次性追加一批变更日志并fsync（调用方持有锁），返回本批写入的字节数"""
+        self._cache.refresh()
+        lines = []
+        for seq, entry in enumerate(entries, self._cache.seq + 1):
+            entry['seq'] = seq
+            lines.append(serializer.dumps(entry) + b'\n')
+        data = b''.join(lines)
+        if self._cache.journal_has_partial_line():
+            # 上次崩溃残留了半行，先补换行使其成为可跳过的独立坏行
+            data = b'\n' + data
+
+        os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+        with open(self.journal_file, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            offset = f.tell()
+        self._cache.applied(entries, offset)
+
+        written = len(data) + extra_bytes
+        self._write_stats['batches'] += 1
+        self._write_stats['mutations'] += len(entries)
+        self._write_stats['bytes_written'] += written
+        self._write_stats['last_batch_bytes'] = written
+
+        if offset >= self.COMPACT_THRESHOLD_BYTES:
+            self._schedule_compaction()
+        return written
+
+    def _schedule_compaction(self):
+        if self._compacting:
+            return
+        self._compacting = True
+        thread = threading.Thread(target=self._compact_background)
+        thread.daemon = True
+        thread.start()
+
+    def _compact_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"压缩文章日志失败: {e}")
+        finally:
+            self._compacting = False
+
+    def compact(self):
+        """把日志合并进新快照，并清理不再被引用的正文"""
+        with self._lock, self._file_lock.exclusive():
+            index = self._load_index()
+            written = self._write_snapshot(index, self._cache.seq)
+            self._write_stats['compactions'] += 1
+            self._write_stats['last_compaction_bytes'] = written
+            self.gc()
+            return written
+
+    def gc(self):
+        """删除没有任何文章和快照引用的正文blob，返回删除数量"""
+        with self._lock, self._file_lock.exclusive():
+            self._ensure_store()
+            pinned = self._pinned_digests()
+            removed = self._content.retain(self._cache.content_keys() | pinned)
+            self._deferred_blobs.intersection_update(pinned)
+            self._write_stats['blobs_removed'] += removed
+            self._history.retain(meta['id'] for meta in self._cache.get())
+            return removed
+
+    def _stored_bodies(self):
+        self._ensure_store()
+        for key in self._cache.content_keys():
+            yield self._content.get_raw(key)
+
+    def recompress(self):
+        with self._lock, self._file_lock.exclusive():
+            self._ensure_store()
+            keys = self._cache.content_keys()
+            items = []
+            for key in keys:
+                stored = self._content.get_raw(key)
+                content = _unpack_content(stored)
+                if stored and _pack_content(content) != stored:
+                    items.append((key, content))
+            self._content.put_many(items)
+            # mmap存储中被覆盖的旧字节在这里回收
+            self._content.retain(keys | self._pinned_digests())
+            return len(items)
+
+    def _view(self):
+        self._ensure_store()
+        return self._cache.view()
+
+    def data_version(self):
+        # 日志序号跨快照延续，整体替换时也会递增
+        self._ensure_store()
+        seq = self._cache.data_seq()
+        keys = [key for key in (_file_key(self.index_file), _file_key(self.journal_file)) if key]
+        return seq, max(key[0] for key in keys) / 1e9 if keys else None
+
+    def _load_content(self, meta):
+        return self._content.get(_content_key(meta))
+
+    def _history_entries(self, article_id):
+        return self._history.entries(article_id)
+
+    def _remove_unreferenced(self, digests):
+        """删除引用计数归零的正文；仍被快照引用的推迟到快照释放后（调用方持有锁）"""
+        digests = [digest for digest in digests
+                   if digest and self._cache.content_refcount(digest) == 0]
+        pinned = self._pinned_digests() if digests else set()
+        removable = [digest for digest in digests if digest not in pinned]
+        self._deferred_blobs.update(digest for digest in digests if digest in pinned)
+        self._content.remove_many(removable)
+        self._write_stats['blobs_removed'] += len(removable)
+
+    def collect_deferred(self):
+        with self._lock, self._file_lock.exclusive():
+            deferred, self._deferred_blobs = self._deferred_blobs, set()
+            self._remove_unreferenced(deferred)
+
+    def get_content(self, article_id):
+        self._ensure_store()
+        meta = self._cache.get_article(article_id)
+        return self._read_content(meta) if meta is not None else ''
+
+    def list_articles(self, with_content=False, source=None, tag=None):
+        articles = [article for article in self._load_index() if _matches(article, source, tag)]
+        if with_content:
+            for article in articles:
+                article['content'] = self._read_content(article, admit=False)
+        return articles
+
+    def get_article(self, article_id, with_content=False):
+        self._ensure_store()
+        article = self._cache.get_article(article_id)
+        if article is not None and with_content:
+            article['content'] = self._read_content(article)
+        return article
+
+    def articles_between(self, start=None, end=None, limit=None):
+        self._ensure_store()
+        return self._cache.between(start, end, limit)
+
+    def page_articles(self, limit=None, after=None, source=None, tag=None):
+        self._ensure_store()
+        articles, more = self._cache.page(after, limit, lambda meta: _matches(meta, source, tag))
+        return articles, articles[-1]['id'] if more and articles else None
+
+    def apply_batch(self, commands):
+        with self._lock, self._file_lock.exclusive():
+            self._ensure_store()
+            self._cache.refresh()
+            # 本批次内的中间状态：id → 元数据，None表示已删除
+            pending = {}
+            entries, contents = [], []
+            # 本批次新写入的正文摘要，以及可能失去最后一个引用的正文摘要
+            stored, released = set(), set()
+            # 本批次的正文（摘要 → 正文），以及按顺序执行的历史版本变更
+            bodies, history = {}, []
+
+            def current(article_id):
+                if article_id in pending:
+                    return pending[article_id]
+                return self._cache.get_article(article_id)
+
+            def store_content(content):
+                digest = content_digest(content)
+                bodies[digest] = content
+                if digest in stored or self._content.contains(digest):
+                    self._write_stats['deduplicated_bodies'] += 1
+                else:
+                    contents.append((digest, content))
+                    stored.add(digest)
+                return digest
+
+            def stage(command, entries):
+                """把一条命令应用到pending并生成日志记录，返回命令结果"""
+                op = command[0]
+                if op == 'transaction':
+                    # 事务内的变更合并为一条日志记录，崩溃后要么全部生效要么全部不生效
+                    sub_entries = []
+                    sub_results = [stage(sub_command, sub_entries) for sub_command in command[1]]
+                    if len(sub_entries) > 1:
+                        entries.append({'op': 'batch', 'entries': sub_entries})
+                    else:
+                        entries.extend(sub_entries)
+                    return sub_results
+                if op == 'upsert':
+                    meta, content = _split_article(command[1])
+                    article = current(meta['id'])
+                    if content is not None:
+                        meta['content_sha256'] = content_digest(content)
+                    elif article is not None and 'content_sha256' not in meta:
+                        # 不带正文的整体替换沿用原正文
+                        meta['content_sha256'] = article.get('content_sha256')
+                    if meta == article:
+                        # 内容与元数据都未变化的重复导入不产生任何写入
+                        self._write_stats['unchanged_upserts'] += 1
+                        return False
+                    if content is not None:
+                        store_content(content)
+                    if article is not None:
+                        if content is not None:
+                            record_history(article, content)
+                        released.add(article.get('content_sha256'))
+                    pending[meta['id']] = meta
+                    entries.append({'op': 'upsert', 'article': meta})
+                    return article is None
+                if op == 'update':
+                    article_id, fields = command[1], dict(command[2])
+                    article = current(article_id)
+                    if article is None:
+                        return None
+                    if 'content' in fields:
+                        content = fields.pop('content') or ''
+                        fields['content_sha256'] = store_content(content)
+                        record_history(article, content)
+                        released.add(article.get('content_sha256'))
+                    pending[article_id] = dict(article, **fields)
+                    entries.append({'op': 'update', 'id': article_id, 'fields': fields})
+                    return dict(pending[article_id])
+                if op == 'delete':
+                    article_id = command[1]
+                    article = current(article_id)
+                    if article is None:
+                        return None
+                    pending[article_id] = None
+                    entries.append({'op': 'delete', 'id': article_id})
+                    history.append(('remove', article_id, None))
+                    released.add(article.get('content_sha256'))
+                    return dict(article)
+                raise CommandError(f"未知的变更类型: {op}")
+
+            def record_history(article, content):
+                """正文被替换时保存旧版本"""
+                if article.get('content_sha256') == content_digest(content):
+                    return
+                previous = bodies.get(article.get('content_sha256'))
+                if previous is None:
+                    previous = self._content.get(_content_key(article))
+                history.append(('append', article['id'], _history_entry(article, previous, content)))
+
+            # 全部命令暂存完成之前不写入任何数据
+            try:
+                results = [stage(command, entries) for command in commands]
+            except CommandError:
+                raise
+            except Exception as e:
+                raise CommandError(f"变更命令执行失败: {e}") from e
+
+            # 正文先于日志落盘，日志中不会出现指向缺失正文的记录
+            content_bytes = self._content.put_many(contents)
+            if entries:
+                self._append(entries, content_bytes)
+            # 历史版本在日志之后写入：崩溃时最多丢失一个历史版本，不会出现未生效变更的历史
+            for action, article_id, entry in history:
+                if action == 'append':
+                    self._history.append(article_id, entry)
+                    self._write_stats['history_versions'] += 1
+                else:
+                    self._history.remove_many([article_id])
+            # 日志落盘后再删除引用计数归零的正文
+            self._remove_unreferenced(released)
+            return results
+
+    def replace_all(self, articles):
+        with self._lock, self._file_lock.exclusive():
+            index, contents, stored = [], [], set()
+            for article in articles:
+                meta, content = _split_article(article)
+                if content is not None:
+                    digest = meta['content_sha256'] = content_digest(content)
+                    if digest not in stored and not self._content.contains(digest):
+                        contents.append((digest, content))
+                        stored.add(digest)
+                elif 'content_sha256' not in meta:
+                    existing = self._cache.get_article(meta['id'])
+                    if existing is not None and existing.get('content_sha256'):
+                        meta['content_sha256'] = existing['content_sha256']
+                index.append(meta)
+            self._content.put_many(contents)
+            # 整体替换也占用一个日志序号，数据版本随之递增
+            self._write_snapshot(index, self._cache.seq + 1)
+            self.gc()
+
+    def invalidate(self):
+        self._cache.invalidate()
+        self._tiers.clear()
+
+    def stats(self):
+        with self._lock:
+            writes = dict(self._write_stats)
+            writes['avg_bytes_per_mutation'] = (
+                round(writes['bytes_written'] / writes['mutations']) if writes['mutations'] else 0
+            )
+            journal_key = _file_key(self.journal_file)
+            writes['journal_bytes'] = journal_key[1] if journal_key else 0
+            writes['journal_entries'] = self._cache.journal_entries
+            content = self._content.stats()
+            content['unique_bodies'] = len(self._cache.content_keys())
+            content['compression'] = CONTENT_COMPRESSION or 'none'
+            return {
+                'engine': self.engine,
+                'version': self._cache.version,
+                'cache': self._cache.stats(),
+                'writes': writes,
+                'content': content,
+                'snapshots': self.snapshot_stats(),
+                'tiers': self._tiers.stats(),
+                'lock': self._file_lock.stats()
+            }
+
+
+class SQLiteArticleStore(ArticleStore):
+    """SQLite存储：id主键查询，date/source二级索引，标签关联表，WAL模式下读写互不阻塞"""
+
+    engine = 'sqlite'
+
+    # 以独立列存储的元数据字段，其余字段存入extra（JSON）
+    COLUMNS = ('title', 'source', 'summary', 'url', 'date', 'pdf_path', 'content_sha256')
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS articles (
+            id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            title TEXT,
+            source TEXT,
+            summary TEXT,
+            url TEXT,
+            date TEXT,
+            pdf_path TEXT,
+            extra TEXT NOT NULL DEFAULT '{}',
+            content TEXT,
+            content_sha256 TEXT
+        );
+        CREATE TABLE IF NOT EXISTS content_blobs (
+            sha256 TEXT PRIMARY KEY,
+            content BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_articles_seq ON articles(seq);
+        DROP INDEX IF EXISTS idx_articles_date;
+        CREATE INDEX IF NOT EXISTS idx_articles_date_seq ON articles(date, seq);
+        CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source);
+        CREATE TABLE IF NOT EXISTS article_tags (
+            article_id TEXT NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (article_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_article_tags_tag ON article_tags(tag);
+        CREATE TABLE IF NOT EXISTS article_history (
+            article_id TEXT NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+            version INTEGER NOT NULL,
+            saved_at TEXT NOT NULL,
+            meta TEXT NOT NULL,
+            base_sha256 TEXT NOT NULL,
+            delta BLOB NOT NULL,
+            PRIMARY KEY (article_id, version)
+        );
+        CREATE TABLE IF NOT EXISTS store_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            modified REAL NOT NULL
+        );
+    """
+
+    # 数据库文件映射上限
+    MMAP_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, db_path=DB_FILE):
+        super().__init__()
+        self.db_path = db_path
+        # 最近一次读取的 (数据版本, 文章元组, id → 元数据)，版本未变时直接复用
+        self._last_view = None
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        # SQLite自身的锁不会等待读事务升级为写事务；写入方先持跨进程独占锁，读-改-写整体串行
+        self._file_lock = StoreLock(db_path + '.lock')
+
+    def _conn(self):
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            # 每次提交都同步WAL，提交返回即已落盘
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            # 读取走内存映射，多个worker进程共享页缓存而不是各自复制到SQLite缓存
+            conn.execute(f'PRAGMA mmap_size={self.MMAP_SIZE}')
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn.executescript(self.SCHEMA)
+            self._migrate_content(conn)
+            self._initialized = True
+            count = conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+            if count == 0:
+                self._import_existing()
+
+    def _migrate_content(self, conn):
+        """旧版本把正文内联存放在articles.content，迁移为按摘要存放到content_blobs"""
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(articles)')}
+        with conn:
+            if 'content_sha256' not in columns:
+                conn.execute('ALTER TABLE articles ADD COLUMN content_sha256 TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_articles_content ON articles(content_sha256)')
+            rows = conn.execute('SELECT id, content FROM articles WHERE content IS NOT NULL').fetchall()
+            for row in rows:
+                digest = content_digest(row['content'])
+                conn.execute('INSERT OR IGNORE INTO content_blobs (sha256, content) VALUES (?, ?)',
+                             (digest, _pack_content(row['content'])))
+                conn.execute('UPDATE articles SET content_sha256 = ?, content = NULL WHERE id = ?',
+                             (digest, row['id']))
+        if rows:
+            print(f"📦 已将 {len(rows)} 篇正文迁移为按SHA-256摘要存储")
+
+    def _import_existing(self):
+        """数据库为空时从JSON存储或articles.json导入"""
+        if os.path.exists(INDEX_FILE):
+            articles = JsonArticleStore().list_articles(with_content=True)
+        elif os.path.exists(ARTICLES_FILE):
+            articles = _read_articles_json(ARTICLES_FILE)
+        else:
+            return
+        self.replace_all(articles)
+        print(f"📦 已导入 {len(articles)} 篇文章到 {self.db_path}")
+
+    def _load_tags(self, conn, article_ids=None):
+        """批量读取标签，返回 {article_id: [tag, ...]}"""
+        if article_ids is None:
+            rows = conn.execute('SELECT article_id, tag FROM article_tags ORDER BY article_id, position')
+        else:
+            placeholders = ','.join('?' * len(article_ids))
+            rows = conn.execute(
+                f'SELECT article_id, tag FROM article_tags WHERE article_id IN ({placeholders}) '
+                'ORDER BY article_id, position',
+                list(article_ids)
+            )
+        tags = {}
+        for row in rows:
+            tags.setdefault(row['article_id'], []).append(row['tag'])
+        return tags
+
+    def _row_to_article(self, row, tags, with_content):
+        article = {'id': row['id']}
+        for column in ('title', 'source', 'summary', 'url', 'date'):
+            article[column] = row[column]
+        article['tags'] = tags.get(row['id'], [])
+        for column in ('pdf_path', 'content_sha256'):
+            if row[column] is not None:
+                article[column] = row[column]
+        article.update(serializer.loads(row['extra']))
+        if with_content:
+            article['content'] = _unpack_content(row['content'])
+        return article
+
+    def _stored_form(self, meta):
+        """meta写入后再读出的样子（与_row_to_article一致）：缺少的列为None，标签为列表"""
+        article = {'id': meta['id']}
+        for column in ('title', 'source', 'summary', 'url', 'date'):
+            article[column] = meta.get(column)
+        article['tags'] = list(meta.get('tags') or [])
+        for column in ('pdf_path', 'content_sha256'):
+            if meta.get(column) is not None:
+                article[column] = meta[column]
+        article.update((key, value) for key, value in meta.items()
+                       if key not in self.COLUMNS and key not in ('id', 'tags'))
+        return article
+
+    def _select(self, with_content):
+        columns = 'id, title, source, summary, url, date, pdf_path, content_sha256, extra'
+        if with_content:
+            columns += ', (SELECT content FROM content_blobs WHERE sha256 = content_sha256) AS content'
+        return f'SELECT {columns} FROM articles'
+
+    def _write(self, conn, meta, content, seq):
+        """插入或更新一条文章记录及其标签（调用方负责事务）
+
+        content不为None时meta中须已带content_sha256；相同摘要的正文只存一份。
+        """
+        if content is not None:
+            conn.execute('INSERT OR IGNORE INTO content_blobs (sha256, content) VALUES (?, ?)',
+                         (meta['content_sha256'], _pack_content(content)))
+        values = [meta.get(column) for column in self.COLUMNS]
+        extra = {key: value for key, value in meta.items()
+                 if key not in self.COLUMNS and key not in ('id', 'tags')}
+        conn.execute(
+            'INSERT INTO articles (id, seq, title, source, summary, url, date, pdf_path, content_sha256, extra) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET seq=excluded.seq, title=excluded.title, '
+            'source=excluded.source, summary=excluded.summary, url=excluded.url, date=excluded.date, '
+            'pdf_path=excluded.pdf_path, extra=excluded.extra, '
+            'content_sha256=COALESCE(excluded.content_sha256, articles.content_sha256)',
+            [meta['id'], seq, *values, serializer.dumps_str(extra)]
+        )
+        conn.execute('DELETE FROM article_tags WHERE article_id = ?', (meta['id'],))
+        conn.executemany(
+            'INSERT INTO article_tags (article_id, position, tag) VALUES (?, ?, ?)',
+            [(meta['id'], i, tag) for i, tag in enumerate(meta.get('tags') or [])]
+        )
+
+    def list_articles(self, with_content=False, source=None, tag=None):
+        conn = self._conn()
+        sql = self._select(with_content)
+        conditions, params = [], []
+        if source is not None:
+            conditions.append('source = ?')
+            params.append(source)
+        if tag is not None:
+            conditions.append('id IN (SELECT article_id FROM article_tags WHERE tag = ?)')
+            params.append(tag)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        rows = conn.execute(sql + ' ORDER BY seq DESC', params).fetchall()
+        tags = self._load_tags(conn) if source is None and tag is None \
+            else self._load_tags(conn, [row['id'] for row in rows])
+        return [self._row_to_article(row, tags, with_content) for row in rows]
+
+    def get_article(self, article_id, with_content=False):
+        conn = self._conn()
+        row = conn.execute(self._select(False) + ' WHERE id = ?', (article_id,)).fetchone()
+        if row is None:
+            return None
+        article = self._row_to_article(row, self._load_tags(conn, [article_id]), False)
+        if with_content:
+            article['content'] = self._read_content(article)
+        return article
+
+    def articles_between(self, start=None, end=None, limit=None):
+        conn = self._conn()
+        sql = self._select(False)
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('date >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('date <= ?')
+            params.append(end)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        # 走 (date, seq) 索引，同一天内按展示顺序
+        sql += ' ORDER BY date DESC, seq DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        rows = conn.execute(sql, params).fetchall()
+        tags = self._load_tags(conn, [row['id'] for row in rows])
+        return [self._row_to_article(row, tags, False) for row in rows]
+
+    def page_articles(self, limit=None, after=None, source=None, tag=None):
+        conn = self._conn()
+        conn.execute('BEGIN')
+        try:
+            sql = self._select(False)
+            conditions, params = [], []
+            if after is not None:
+                row = conn.execute('SELECT seq FROM articles WHERE id = ?', (after,)).fetchone()
+                if row is None:
+                    raise ValueError(f"分页游标对应的文章不存在: {after}")
+                conditions.append('seq < ?')
+                params.append(row['seq'])
+            if source is not None:
+                conditions.append('source = ?')
+                params.append(source)
+            if tag is not None:
+                conditions.append('id IN (SELECT article_id FROM article_tags WHERE tag = ?)')
+                params.append(tag)
+            if conditions:
+                sql += ' WHERE ' + ' AND '.join(conditions)
+            sql += ' ORDER BY seq DESC'
+            if limit is not None:
+                # 多取一篇判断是否还有下一页
+                sql += ' LIMIT ?'
+                params.append(limit + 1)
+            rows = conn.execute(sql, params).fetchall()
+            more = limit is not None and len(rows) > limit
+            rows = rows[:limit] if more else rows
+            tags = self._load_tags(conn, [row['id'] for row in rows])
+        finally:
+            conn.execute('COMMIT')
+        articles = [self._row_to_article(row, tags, False) for row in rows]
+        return articles, articles[-1]['id'] if more and articles else None
+
+    def get_content(self, article_id):
+        row = self._conn().execute('SELECT content_sha256 FROM articles WHERE id = ?', (article_id,)).fetchone()
+        return self._read_content({'content_sha256': row['content_sha256']}) if row else ''
+
+    def _view(self):
+        conn = self._conn()
+        # 在同一个读事务中读取数据版本、文章和标签，WAL模式下得到一致的数据库快照；
+        # 版本号即已提交的数据版本，同一版本的快照共用一份元数据
+        conn.execute('BEGIN')
+        try:
+            row = conn.execute('SELECT version FROM store_version WHERE id = 1').fetchone()
+            version = row['version'] if row else 0
+            view = self._last_view
+            if view is None or view[0] != version:
+                articles = tuple(self.list_articles())
+                view = version, articles, {article['id']: article for article in articles}
+                self._last_view = view
+        finally:
+            conn.execute('COMMIT')
+        return view
+
+    def invalidate(self):
+        self._last_view = None
+        super().invalidate()
+
+    def _tier_version(self):
+        # 其他进程的提交同样会改变数据库或WAL文件，不必读取全部元数据即可判断
+        return _file_key(self.db_path), _file_key(self.db_path + '-wal')
+
+    def _load_content(self, meta):
+        digest = meta.get('content_sha256')
+        if not digest:
+            return ''
+        row = self._conn().execute('SELECT content FROM content_blobs WHERE sha256 = ?', (digest,)).fetchone()
+        return _unpack_content(row['content']) if row else ''
+
+    def _history_entries(self, article_id):
+        rows = self._conn().execute(
+            'SELECT version, saved_at, meta, base_sha256, delta FROM article_history '
+            'WHERE article_id = ? ORDER BY version', (article_id,)
+        ).fetchall()
+        return [{
+            'version': row['version'],
+            'saved_at': row['saved_at'],
+            'meta': serializer.loads(row['meta']),
+            'base_sha256': row['base_sha256'],
+            'delta': _unpack_delta(row['delta'])
+        } for row in rows]
+
+    def _record_history(self, conn, article, content):
+        """正文被替换时在同一事务中保存旧版本，只保留最新的HISTORY_LIMIT个"""
+        if article.get('content_sha256') == content_digest(content):
+            return
+        entry = _history_entry(article, self._load_content(article), content)
+        version = conn.execute('SELECT COALESCE(MAX(version), 0) + 1 FROM article_history WHERE article_id = ?',
+                               (article['id'],)).fetchone()[0]
+        conn.execute(
+            'INSERT INTO article_history (article_id, version, saved_at, meta, base_sha256, delta) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (article['id'], version, entry['saved_at'], serializer.dumps_str(entry['meta']),
+             entry['base_sha256'], _pack_delta(entry['delta']))
+        )
+        conn.execute('DELETE FROM article_history WHERE article_id = ? AND version <= ?',
+                     (article['id'], version - HISTORY_LIMIT))
+
+    def collect_deferred(self):
+        with self._pin_lock:
+            deferred, self._deferred_blobs = self._deferred_blobs, set()
+        conn = self._conn()
+        with self._file_lock.exclusive(), conn:
+            for digest in deferred:
+                self._release(conn, digest)
+
+    def _release(self, conn, digest):
+        """正文不再被任何文章引用时删除；仍被快照引用的推迟到快照释放后"""
+        if digest and digest in self._pinned_digests():
+            with self._pin_lock:
+                self._deferred_blobs.add(digest)
+        elif digest:
+            conn.execute(
+                'DELETE FROM content_blobs WHERE sha256 = ? '
+                'AND NOT EXISTS (SELECT 1 FROM articles WHERE content_sha256 = ?)',
+                (digest, digest)
+            )
+
+    def _upsert(self, conn, article):
+        meta, content = _split_article(article)
+        if content is not None:
+            meta['content_sha256'] = content_digest(content)
+        row = conn.execute('SELECT seq FROM articles WHERE id = ?', (meta['id'],)).fetchone()
+        if row is not None:
+            existing = self.get_article(meta['id'])
+            if content is None and 'content_sha256' not in meta:
+                meta['content_sha256'] = existing.get('content_sha256')
+            if self._stored_form(meta) == existing:
+                # 内容与元数据都未变化的重复导入不产生任何写入
+                return False
+            if content is not None:
+                self._record_history(conn, existing, content)
+            self._write(conn, meta, content, row['seq'])
+            self._release(conn, existing.get('content_sha256'))
+            return False
+        next_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM articles').fetchone()[0]
+        self._write(conn, meta, content, next_seq)
+        return True
+
+    def _update(self, conn, article_id, fields):
+        row = conn.execute('SELECT seq FROM articles WHERE id = ?', (article_id,)).fetchone()
+        if row is None:
+            return None
+        article = self.get_article(article_id)
+        previous_digest = article.get('content_sha256')
+        fields = dict(fields)
+        content = fields.pop('content', None)
+        if content is not None:
+            fields['content_sha256'] = content_digest(content)
+            self._record_history(conn, article, content)
+        article.update(fields)
+        self._write(conn, article, content, row['seq'])
+        self._release(conn, previous_digest)
+        return article
+
+    def _delete(self, conn, article_id):
+        article = self.get_article(article_id)
+        if article is None:
+            return None
+        conn.execute('DELETE FROM articles WHERE id = ?', (article_id,))
+        self._release(conn, article.get('content_sha256'))
+        return article
+
+    def gc(self, conn=None):
+        """删除没有任何文章引用的正文，返回删除数量"""
+        if conn is None:
+            conn = self._conn()
+            with self._file_lock.exclusive(), conn:
+                return self.gc(conn)
+        pinned = self._pinned_digests()
+        rows = conn.execute(
+            'SELECT sha256 FROM content_blobs WHERE sha256 NOT IN '
+            '(SELECT content_sha256 FROM articles WHERE content_sha256 IS NOT NULL)'
+        ).fetchall()
+        unreferenced = [(row['sha256'],) for row in rows if row['sha256'] not in pinned]
+        conn.executemany('DELETE FROM content_blobs WHERE sha256 = ?', unreferenced)
+        with self._pin_lock:
+            self._deferred_blobs.update(row['sha256'] for row in rows if row['sha256'] in pinned)
+        return len(unreferenced)
+
+    def _stored_bodies(self):
+        for row in self._conn().execute('SELECT content FROM content_blobs'):
+            yield row['content']
+
+    def recompress(self):
+        conn = self._conn()
+        with self._file_lock.exclusive():
+            with conn:
+                rows = conn.execute('SELECT sha256, content FROM content_blobs').fetchall()
+                changed = []
+                for row in rows:
+                    packed = _pack_content(_unpack_content(row['content']))
+                    # 旧版本以TEXT存放的正文与bytes不相等，同样会被重写
+                    if packed != row['content']:
+                        changed.append((packed, row['sha256']))
+                conn.executemany('UPDATE content_blobs SET content = ? WHERE sha256 = ?', changed)
+            if changed:
+                # 归还重写后空出的页，数据库文件随之缩小
+                conn.execute('VACUUM')
+        return len(changed)
+
+    def _bump_version(self, conn):
+        """在写事务中递增数据版本"""
+        conn.execute(
+            'INSERT INTO store_version (id, version, modified) VALUES (1, 1, ?) '
+            'ON CONFLICT(id) DO UPDATE SET version = version + 1, modified = excluded.modified',
+            (time.time(),)
+        )
+
+    def data_version(self):
+        row = self._conn().execute('SELECT version, modified FROM store_version WHERE id = 1').fetchone()
+        if row is None:
+            key = _file_key(self.db_path)
+            return 0, key[0] / 1e9 if key else None
+        return row['version'], row['modified']
+
+    def apply_batch(self, commands):
+        conn = self._conn()
+        # 整批变更在同一个事务中提交
+        with self._file_lock.exclusive(), conn:
+            changes = conn.total_changes
+            # 提交之前出错时整个事务回滚，批次未写入任何数据
+            try:
+                results = [self._stage(conn, command) for command in commands]
+            except CommandError:
+                raise
+            except Exception as e:
+                raise CommandError(f"变更命令执行失败: {e}") from e
+            # 全部为未变化的重复导入时版本不变
+            if conn.total_changes != changes:
+                self._bump_version(conn)
+            return results
+
+    def _stage(self, conn, command):
+        op = command[0]
+        if op == 'transaction':
+            return [self._stage(conn, sub_command) for sub_command in command[1]]
+        if op == 'upsert':
+            return self._upsert(conn, command[1])
+        if op == 'update':
+            return self._update(conn, command[1], command[2])
+        if op == 'delete':
+            return self._delete(conn, command[1])
+        raise CommandError(f"未知的变更类型: {op}")
+
+    def replace_all(self, articles):
+        conn = self._conn()
+        with self._file_lock.exclusive(), conn:
+            ids = [article['id'] for article in articles]
+            if ids:
+                placeholders = ','.join('?' * len(ids))
+                conn.execute(f'DELETE FROM articles WHERE id NOT IN ({placeholders})', ids)
+            else:
+                conn.execute('DELETE FROM articles')
+            # 列表第一篇的seq最大，保持原有顺序
+            for seq, article in enumerate(reversed(articles), 1):
+                meta, content = _split_article(article)
+                if content is not None:
+                    meta['content_sha256'] = content_digest(content)
+                self._write(conn, meta, content, seq)
+            self.gc(conn)
+            self._bump_version(conn)
+
+    def stats(self):
+        conn = self._conn()
+        count = conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+        blobs = conn.execute('SELECT COUNT(*) FROM content_blobs').fetchone()[0]
+        wal_path = self.db_path + '-wal'
+        return {
+            'engine': self.engine,
+            'articles': count,
+            'unique_bodies': blobs,
+            'compression': CONTENT_COMPRESSION or 'none',
+            'snapshots': self.snapshot_stats(),
+            'tiers': self._tiers.stats(),
+            'lock': self._file_lock.stats(),
+            'db_size': os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0,
+            'wal_size': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        }
+
+
+def _validate_command(command):
+    """检查变更命令的格式，格式错误时抛出CommandError
+
+    在提交时检查，格式错误的命令不会进入写队列、拖累同一批次的其他命令
+    """
+    op = command[0] if command else None
+    if op == 'collect':
+        if len(command) != 1:
+            raise CommandError('collect命令没有参数')
+        return
+    if op in ('upsert', 'delete', 'transaction', 'replace_all') and len(command) != 2:
+        raise CommandError(f"变更命令 {op} 的参数个数错误")
+    if op == 'upsert':
+        article = command[1]
+        if not isinstance(article, dict) or 'id' not in article:
+            raise CommandError('写入的文章必须是包含id的dict')
+    elif op == 'update':
+        if len(command) != 3 or not isinstance(command[2], dict):
+            raise CommandError('update命令格式为 (update, article_id, fields)')
+    elif op == 'delete':
+        pass
+    elif op == 'transaction':
+        for sub_command in command[1]:
+            _validate_command(sub_command)
+    elif op == 'replace_all':
+        for article in command[1]:
+            _validate_command(('upsert', article))
+    else:
+        raise CommandError(f"未知的变更类型: {op}")
+
+
+class ArticleWriter:
+    """单写线程
+
+    独占文章存储的全部写操作：请求处理线程提交变更命令并等待Future，
+    写线程把一个时间窗口内排队的命令合并成一次持久化写入（一次日志追加+fsync，
+    或一个SQLite事务），落盘后再逐个完成对应的Future。
+    批次在暂存阶段失败（CommandError，尚未写入）时逐条重新执行，只有出错的命令收到异常；
+    持久化开始后的失败不重试，整批的调用方都收到异常。
+    """
+
+    # 合并窗口（秒）：收到第一条命令后再等待这么久收集后续命令
+    COALESCE_WINDOW = 0.02
+
+    def __init__(self, store, window=COALESCE_WINDOW):
+        self.store = store
+        self.window = window
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats = {'commands': 0, 'batches': 0, 'max_batch': 0, 'split_batches': 0, 'collections': 0}
+        self._collect_pending = False
+        store.request_collect = self.request_collect
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='article-writer')
+                    self._thread.daemon = True
+                    self._thread.start()
+
+    def submit(self, *command):
+        """提交一条变更命令，返回在变更落盘后完成的Future；命令格式错误时抛出CommandError"""
+        _validate_command(command)
+        future = Future()
+        self._ensure_started()
+        self._queue.put((command, future))
+        return future
+
+    def _collect(self):
+        """取出第一条命令，并收集合并窗口内到达的后续命令"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._stats['batches'] += 1
+            self._stats['commands'] += len(batch)
+            self._stats['max_batch'] = max(self._stats['max_batch'], len(batch))
+
+            # 整体替换和正文回收单独执行，其余相邻命令合并为一批
+            segment = []
+            for command, future in batch:
+                if command[0] == 'replace_all':
+                    self._execute(segment)
+                    segment = []
+                    self._execute_replace(command[1], future)
+                elif command[0] == 'collect':
+                    self._execute(segment)
+                    segment = []
+                    self._execute_collect(future)
+                else:
+                    segment.append((command, future))
+            self._execute(segment)
+
+    def _execute(self, segment):
+        if not segment:
+            return
+        try:
+            results = self.store.apply_batch([command for command, _ in segment])
+        except CommandError as e:
+            if len(segment) == 1:
+                segment[0][1].set_exception(e)
+                return
+            # 暂存阶段出错时批次未写入任何数据，逐条重新执行，其他调用方不受出错命令的影响
+            self._stats['split_batches'] += 1
+            for item in segment:
+                self._execute([item])
+            return
+        except Exception as e:
+            # 持久化开始后出错：部分变更可能已经生效，重试会重复执行，整批报告失败
+            for _, future in segment:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(segment, results):
+            future.set_result(result)
+
+    def _execute_collect(self, future):
+        self._collect_pending = False
+        self._stats['collections'] += 1
+        try:
+            self.store.collect_deferred()
+        except Exception as e:
+            print(f"回收推迟删除的正文失败: {e}")
+            future.set_exception(e)
+        else:
+            future.set_result(True)
+
+    def request_collect(self):
+        """快照释放后由读者线程调用：排队一次正文回收，已排队时不重复提交"""
+        if self._collect_pending:
+            return
+        self._collect_pending = True
+        self.submit('collect')
+
+    def _execute_replace(self, articles, future):
+        try:
+            self.store.replace_all(articles)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(True)
+
+    def upsert_article(self, article):
+        """新增或整体替换文章，落盘后返回是否为新增"""
+        return self.submit('upsert', article).result()
+
+    def update_article(self, article_id, fields):
+        """部分更新文章元数据，落盘后返回更新后的元数据，文章不存在时返回None"""
+        return self.submit('update', article_id, fields).result()
+
+    def delete_article(self, article_id):
+        """删除文章，落盘后返回被删除文章的元数据，文章不存在时返回None"""
+        return self.submit('delete', article_id).result()
+
+    def replace_all(self, articles):
+        """整体替换存储内容"""
+        return self.submit('replace_all', articles).result()
+
+    def begin(self):
+        """开始一个事务，commit时作为一条命令交给写线程，整体落盘后返回"""
+        return Transaction(lambda commands: self.submit('transaction', commands).result())
+
+    def upsert_many(self, articles):
+        """批量新增或替换文章，落盘后返回每篇是否为新增"""
+        with self.begin() as txn:
+            txn.upsert_many(articles)
+        return txn.results
+
+    def delete_many(self, article_ids):
+        """批量删除文章，落盘后返回每篇被删除文章的元数据（不存在时为None）"""
+        with self.begin() as txn:
+            txn.delete_many(article_ids)
+        return txn.results
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['avg_batch'] = round(stats['commands'] / stats['batches'], 2) if stats['batches'] else 0
+        return stats
+
+
+def _read_articles_json(path):
+    return serializer.load_file(path)
+
+
+_store = None
+_store_lock = threading.RLock()
+
+
+def get_store():
+    """获取进程内共享的文章存储实例"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteArticleStore() if STORE_ENGINE == 'sqlite' else JsonArticleStore()
+    return _store
+
+
+_writer = None
+
+
+def get_writer():
+    """获取进程内唯一的文章写线程，所有写操作都应经由它提交"""
+    global _writer
+    if _writer is None:
+        with _store_lock:
+            if _writer is None:
+                _writer = ArticleWriter(get_store())
+    return _writer
+
+
+def load_articles(with_content=False):
+    """加载文章数据
+
+    默认只返回元数据；with_content=True 时逐篇读取正文并填入content字段。
+    """
+    try:
+        return get_store().list_articles(with_content=with_content)
+    except Exception as e:
+        print(f"加载文章失败: {e}")
+        return []
+
+
+def load_article_models():
+    """加载Article模型列表，正文在访问article.content时才读取"""
+    try:
+        store = get_store()
+        return [Article.from_dict(meta, store.get_content) for meta in store.list_articles()]
+    except Exception as e:
+        print(f"加载文章失败: {e}")
+        return []
+
+
+def ingest_articles(articles):
+    """写入一批文章（已存在则更新，否则添加到开头），整批在一个事务中提交
+
+    爬虫、PDF处理器和服务器接口的文章写入都经由这里，文章可以是dict或Article；
+    带正文的文章在写入前重新计算派生字段（纯文本、字数、图片数、封面图）。
+    返回每篇是否为新增，失败时返回None。
+    """
+    # 未加载正文的Article只更新元数据，保留原有正文和派生字段
+    articles = [article.to_dict(with_content=article.content_loaded) if isinstance(article, Article) else article
+                for article in articles]
+    articles = [dict(article, **derive_fields(article['content'])) if article.get('content') is not None else article
+                for article in articles]
+    try:
+        results = get_writer().upsert_many(articles)
+    except Exception as e:
+        print(f"❌ 更新文章存储失败: {e}")
+        return None
+    for article, created in zip(articles, results):
+        if created:
+            print(f"✅ 添加了新文章: {article.get('title', article.get('id'))}")
+        else:
+            print(f"✅ 更新了现有文章: {article.get('title', article.get('id'))}")
+    print(f"📝 已更新 {get_store().engine} 文章存储")
+    return results
+
+
+def backfill_derived_fields(force=False):
+    """为缺少派生字段的文章（force=True时为全部文章）从正文计算并保存，返回更新的篇数"""
+    store = get_store()
+    targets = [meta for meta in store.list_articles()
+               if force or any(field not in meta for field in DERIVED_FIELDS)]
+    if not targets:
+        return 0
+    with get_writer().begin() as txn:
+        for meta in targets:
+            txn.update(meta['id'], derive_fields(store.get_content(meta['id'])))
+    return len(targets)
+
+
+def restore_article_version(article_id, version):
+    """把文章恢复为某个历史版本（当前版本随之存为新的历史版本）
+
+    返回恢复后的文章元数据；版本不存在时返回None，写入失败时抛出异常。
+    """
+    article = get_store().get_version(article_id, version)
+    if article is None:
+        return None
+    article.pop('content_sha256', None)
+    get_writer().upsert_many([dict(article, **derive_fields(article['content']))])
+    return get_store().get_article(article_id)
+
+
+def save_articles(articles):
+    """保存文章数据（整体替换）"""
+    try:
+        get_writer().replace_all(articles)
+        return True
+    except Exception as e:
+        get_store().invalidate()
+        print(f"保存文章失败: {e}")
+        return False
+
+
+def export_articles_json(articles=None, path=ARTICLES_FILE, pretty=None, snapshot=None):
+    """导出包含正文的完整articles.json，供前端页面和静态构建使用
+
+    articles 为已带正文的文章列表时直接导出，避免重复读取正文；
+    snapshot 为 get_store().snapshot() 返回的快照时导出该版本。
+    """
+    try:
+        get_store().export_json(path, articles, pretty=pretty, snapshot=snapshot)
+        return True
+    except Exception as e:
+        print(f"导出文章失败: {e}")
+        return False
+
+
+def migrate_from_articles_json(source=ARTICLES_FILE):
+    """将单文件articles.json导入当前存储引擎"""
+    articles = _read_articles_json(source)
+    get_writer().replace_all(articles)
+    print(f"📦 已迁移 {len(articles)} 篇文章到 {get_store().engine} 存储")
+    return len(articles)
+
+
+def invalidate_cache():
+    """手动清空文章缓存"""
+    get_store().invalidate()
+
+
+def print_content_report(report):
+    """打印正文压缩效果"""
+    def kb(size):
+        return f"{size / 1024:,.1f} KB"
+
+    def saved(before, after):
+        return f"{(1 - after / before) * 100:.1f}%" if before else '0.0%'
+
+    codecs = ', '.join(f"{codec} {count}" for codec, count in sorted(report['codecs'].items()))
+    print(f"📊 正文 {report['bodies']} 份，压缩方式 {report['compression']}（{codecs or '无'}）")
+    print(f"   磁盘: 原始 {kb(report['raw_bytes'])} → 存储 {kb(report['stored_bytes'])}，"
+          f"节省 {saved(report['raw_bytes'], report['stored_bytes'])}")
+    print(f"   内存: 解码为str {kb(report['memory_decoded_bytes'])} → 保持压缩 {kb(report['memory_stored_bytes'])}，"
+          f"节省 {saved(report['memory_decoded_bytes'], report['memory_stored_bytes'])}")
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command == 'migrate':
+        migrate_from_articles_json()
+    elif command == 'gc':
+        print(f"🧹 已删除 {get_store().gc()} 份无引用的正文")
+    elif command == 'export':
+        if export_articles_json(pretty=True if '--pretty' in sys.argv else None):
+            print(f"📝 已导出 {ARTICLES_FILE}")
+    elif command == 'compress':
+        print(f"🗜️ 已重新压缩 {get_store().recompress()} 份正文")
+        print_content_report(get_store().content_report())
+    elif command == 'sizes':
+        print_content_report(get_store().content_report())
+    elif command == 'derive':
+        print(f"🧮 已为 {backfill_derived_fields(force='--force' in sys.argv)} 篇文章计算派生字段")
+    else:
+        print("用法: python3 article_store.py [migrate|gc|export [--pretty]|compress|sizes|derive [--force]]")
+        print("      ARTICLE_STORE_ENGINE=sqlite python3 article_store.py export")
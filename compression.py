@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP响应压缩
+根据请求的 Accept-Encoding 协商 br（安装了brotli时）或 gzip：
+
+- init_app(app)：注册after_request钩子，压缩超过阈值的JSON和文本响应
+- precompress_files(paths)：构建时为静态文件写入 .br/.gz 兄弟文件，
+  serve_static 直接发送预压缩文件，不再为每个请求消耗CPU
+- find_precompressed(path, accept_encoding)：查找可直接发送的预压缩文件
+
+用法: python3 compression.py [文件或目录 ...]   预压缩并打印压缩率（默认为网站构建产物）
+"""
+
+import os
+import sys
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小于该字节数的响应不压缩，压缩收益抵不过开销
+COMPRESS_MIN_BYTES = int(os.environ.get('HTTP_COMPRESS_MIN_BYTES', '1024'))
+# 动态响应追求速度，预压缩追求体积
+GZIP_LEVEL = 6
+GZIP_STATIC_LEVEL = 9
+BROTLI_QUALITY = 5
+BROTLI_STATIC_QUALITY = 11
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/javascript',
+    'text/html', 'text/css', 'text/plain', 'text/markdown', 'image/svg+xml'
+}
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.txt', '.md')
+
+# 预压缩文件的扩展名，协商时按此顺序优先
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+# 网站构建产物
+DEFAULT_TARGETS = ('index.html', 'styles.css', 'script.js', 'article.js', 'posts/articles.json', 'articles')
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _accepted(accept_encoding):
+    """解析Accept-Encoding，返回 {编码: q值}"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding, encodings=None):
+    """从encodings（默认为本机可用的编码）中按客户端接受程度选出编码（同等时优先br），
+    都不接受或encodings为空时返回None"""
+    if encodings is None:
+        encodings = available_encodings()
+    accepted = _accepted(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, static=False):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_STATIC_QUALITY if static else BROTLI_QUALITY)
+    if encoding == 'gzip':
+        # mtime固定为0，相同内容得到相同字节
+        return gzip.compress(data, compresslevel=GZIP_STATIC_LEVEL if static else GZIP_LEVEL, mtime=0)
+    raise ValueError(f"不支持的压缩编码: {encoding}")
+
+
+def init_app(app):
+    """为Flask应用注册响应压缩"""
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        from flask import request
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        data = response.get_data()
+        if encoding is None or len(data) < COMPRESS_MIN_BYTES:
+            return response
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        # 压缩后字节不同，强ETag改为弱ETag（做法同nginx），条件请求仍可按弱比较命中
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    return app
+
+
+def find_precompressed(path, accept_encoding):
+    """返回 (预压缩文件路径, 编码)；没有可用的预压缩文件或已过期时返回 (None, None)"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None, None
+    existing = [encoding for encoding, suffix in PRECOMPRESSED if os.path.exists(path + suffix)]
+    if not existing:
+        return None, None
+    encoding = choose_encoding(accept_encoding, existing)
+    if encoding is None:
+        return None, None
+    compressed = path + dict(PRECOMPRESSED)[encoding]
+    # 原文件在预压缩之后又被修改时不使用
+    if os.path.getmtime(compressed) < mtime:
+        return None, None
+    return compressed, encoding
+
+
+def remove_precompressed(path, encodings=None):
+    """删除文件的预压缩兄弟文件，encodings为None时删除全部编码的"""
+    for encoding, suffix in PRECOMPRESSED:
+        if encodings is not None and encoding not in encodings:
+            continue
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    yield os.path.join(root, filename)
+        elif os.path.isfile(path):
+            yield path
+
+
+def precompress_files(paths=DEFAULT_TARGETS):
+    """为文本静态文件写入 .br/.gz 兄弟文件，返回压缩统计
+
+    小于阈值的文件不写（并删除旧的兄弟文件）；某种编码压缩后不变小时只跳过该编码；已是最新的跳过。
+    """
+    report = {'files': 0, 'raw_bytes': 0, 'encodings': {}}
+    for path in _iter_files(paths):
+        if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < COMPRESS_MIN_BYTES:
+            remove_precompressed(path)
+            continue
+        report['files'] += 1
+        report['raw_bytes'] += len(data)
+        mtime = os.path.getmtime(path)
+        for encoding in available_encodings():
+            target = path + dict(PRECOMPRESSED)[encoding]
+            if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                size = os.path.getsize(target)
+            else:
+                compressed = compress(data, encoding, static=True)
+                if len(compressed) >= len(data):
+                    # 只删除这一种编码的旧兄弟文件，其他编码的保留
+                    remove_precompressed(path, (encoding,))
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(compressed)
+                size = len(compressed)
+            stats = report['encodings'].setdefault(encoding, {'files': 0, 'raw_bytes': 0, 'bytes': 0})
+            stats['files'] += 1
+            stats['raw_bytes'] += len(data)
+            stats['bytes'] += size
+    return report
+
+
+def print_report(report):
+    """打印预压缩效果"""
+    print(f"🗜️ 预压缩 {report['files']} 个文件，原始 {report['raw_bytes'] / 1024:,.1f} KB")
+    for encoding, stats in report['encodings'].items():
+        ratio = stats['bytes'] / stats['raw_bytes'] if stats['raw_bytes'] else 1.0
+        print(f"   {encoding}: {stats['raw_bytes'] / 1024:,.1f} KB → {stats['bytes'] / 1024:,.1f} KB"
+              f"（{ratio:.1%}）")
+    if brotli is None:
+        print("   未安装brotli，仅生成gzip（pip install brotli）")
+
+
+if __name__ == '__main__':
+    print_report(precompress_files(sys.argv[1:] or DEFAULT_TARGETS))
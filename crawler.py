@@ -6,7 +6,6 @@
 """
 
 import requests
-import json
 import re
 import time
 from datetime import datetime
@@ -16,6 +15,9 @@ import html
 import os
 import hashlib
 
+from article_store import ingest_articles, export_articles_json
+from article_model import Article, derive_fields, html_to_text
+
 class WeChatArticleCrawler:
     def __init__(self):
         self.session = requests.Session()
@@ -47,10 +49,15 @@ class WeChatArticleCrawler:
             print(f"提取文章ID失败: {e}")
             return None
     
-    def fetch_article_content(self, url):
-        """抓取文章内容"""
+    def fetch_article_content(self, url, progress_callback=None):
+        """抓取文章内容
+
+        progress_callback(progress, message, details) 在抓取、解析、下载图片各阶段报告进度
+        """
         try:
             print(f"正在抓取文章: {url}")
+            if progress_callback:
+                progress_callback(10, '正在抓取文章...', url)
             
             # 尝试直接访问
             response = self.session.get(url, timeout=30)
@@ -59,12 +66,12 @@ class WeChatArticleCrawler:
             # 检查是否被重定向到验证页面
             if "环境异常" in response.text or "完成验证" in response.text:
                 print("⚠️  文章需要验证，尝试使用备用方法...")
-                return self.fetch_with_alternative_method(url)
+                return self.fetch_with_alternative_method(url, progress_callback)
             
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # 提取文章信息
-            article_data = self.parse_article_content(soup, url)
+            article_data = self.parse_article_content(soup, url, progress_callback)
             return article_data
             
         except requests.RequestException as e:
@@ -74,7 +81,7 @@ class WeChatArticleCrawler:
             print(f"❌ 抓取失败: {e}")
             return None
     
-    def fetch_with_alternative_method(self, url):
+    def fetch_with_alternative_method(self, url, progress_callback=None):
         """备用抓取方法"""
         try:
             # 尝试使用不同的User-Agent
@@ -92,7 +99,7 @@ class WeChatArticleCrawler:
                 print("⚠️  文章需要验证，生成模拟内容...")
                 return self.generate_mock_content(url)
             
-            return self.parse_article_content(soup, url)
+            return self.parse_article_content(soup, url, progress_callback)
             
         except Exception as e:
             print(f"❌ 备用方法也失败: {e}")
@@ -121,9 +128,12 @@ class WeChatArticleCrawler:
             '''
         }
     
-    def parse_article_content(self, soup, url):
+    def parse_article_content(self, soup, url, progress_callback=None):
         """解析文章内容"""
         try:
+            if progress_callback:
+                progress_callback(30, '正在解析文章...', '提取标题、来源和正文')
+            
             # 生成文章ID
             article_id = self.extract_article_id(url) or f"article-{int(time.time())}"
             
@@ -137,7 +147,7 @@ class WeChatArticleCrawler:
             content = self.extract_content(soup)
             
             # 处理图片下载
-            content = self.process_article_images(content, article_id)
+            content = self.process_article_images(content, article_id, progress_callback)
             
             # 生成摘要
             summary = self.generate_summary(content)
@@ -153,7 +163,9 @@ class WeChatArticleCrawler:
                 'url': url,
                 'date': datetime.now().strftime('%Y-%m-%d'),
                 'tags': tags,
-                'content': content
+                'content': content,
+                # 纯文本、字数、图片数、封面图，读取方直接使用而不再解析正文
+                **derive_fields(content)
             }
             
         except Exception as e:
@@ -267,9 +279,8 @@ class WeChatArticleCrawler:
     def generate_summary(self, content):
         """生成文章摘要"""
         try:
-            # 移除HTML标签
-            text_content = re.sub(r'<[^>]+>', '', content)
-            text_content = re.sub(r'\s+', ' ', text_content).strip()
+            # 移除HTML标签、脚本和样式
+            text_content = html_to_text(content)
             
             # 取前200个字符作为摘要
             if len(text_content) > 200:
@@ -345,61 +356,33 @@ class WeChatArticleCrawler:
             print(f"下载图片失败 {image_url}: {e}")
             return image_url  # 返回原URL作为备用
     
-    def process_article_images(self, article_content, article_id):
-        """处理文章中的所有图片"""
+    def process_article_images(self, article_content, article_id, progress_callback=None):
+        """处理文章中的所有图片，下载进度按 已完成/总数 报告（占40%~85%）"""
         if not article_content:
             return article_content
         
         # 查找所有图片标签
         img_pattern = r'<img[^>]+src=["\']([^"\']+)["\'][^>]*>'
         img_matches = re.findall(img_pattern, article_content)
+        img_urls = [img_url for img_url in img_matches
+                    if 'mmbiz.qpic.cn' in img_url or 'res.wx.qq.com' in img_url]
         
-        for img_url in img_matches:
-            if 'mmbiz.qpic.cn' in img_url or 'res.wx.qq.com' in img_url:
-                # 下载图片
-                local_path = self.download_image(img_url, article_id)
-                
-                # 替换URL
-                article_content = article_content.replace(img_url, local_path)
+        for index, img_url in enumerate(img_urls, 1):
+            if progress_callback:
+                progress_callback(40 + 45 * (index - 1) // len(img_urls),
+                                  f'正在下载图片 {index}/{len(img_urls)}...', img_url)
+            
+            # 下载图片
+            local_path = self.download_image(img_url, article_id)
+            
+            # 替换URL
+            article_content = article_content.replace(img_url, local_path)
         
         return article_content
     
     def update_articles_json(self, new_article):
-        """更新articles.json文件"""
-        try:
-            json_file = 'posts/articles.json'
-            
-            # 读取现有文章
-            if os.path.exists(json_file):
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    articles = json.load(f)
-            else:
-                articles = []
-            
-            # 检查是否已存在相同ID的文章
-            existing_ids = [article.get('id') for article in articles]
-            if new_article['id'] in existing_ids:
-                # 更新现有文章
-                for i, article in enumerate(articles):
-                    if article.get('id') == new_article['id']:
-                        articles[i] = new_article
-                        print(f"✅ 更新了现有文章: {new_article['title']}")
-                        break
-            else:
-                # 添加新文章到开头
-                articles.insert(0, new_article)
-                print(f"✅ 添加了新文章: {new_article['title']}")
-            
-            # 保存文件
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(articles, f, ensure_ascii=False, indent=2)
-            
-            print(f"📝 已更新 {json_file}")
-            return True
-            
-        except Exception as e:
-            print(f"❌ 更新JSON文件失败: {e}")
-            return False
+        """将文章写入文章存储（已存在则更新，否则添加到开头）"""
+        return ingest_articles([Article.from_dict(new_article)]) is not None
 
 def main():
     """主函数"""
@@ -435,7 +418,7 @@ def main():
         confirm = input("\n是否将此文章添加到网站? (y/n): ").strip().lower()
         
         if confirm in ['y', 'yes', '是', '确定']:
-            if crawler.update_articles_json(article_data):
+            if crawler.update_articles_json(article_data) and export_articles_json():
                 print("\n🎉 文章已成功添加到网站!")
                 print("请刷新浏览器查看更新后的内容。")
             else:
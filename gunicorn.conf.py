@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn生产配置：gunicorn -c gunicorn.conf.py wsgi:app
+
+均可用环境变量调整：
+    SERVER_BIND          监听地址，默认 0.0.0.0:8888
+    SERVER_WORKERS       worker进程数，默认 CPU核数+1
+    SERVER_THREADS       每个worker的线程数，默认 4
+    SERVER_MAX_REQUESTS  worker处理这么多请求后重启（防止内存增长），默认 1000，0为不重启
+    SERVER_TIMEOUT       单个请求的超时秒数，默认 120
+    SERVER_GRACEFUL_TIMEOUT  退出/重启时等待进行中的请求和后台任务的秒数，默认 120
+    SSE_MAX_STREAMS      每个worker同时推送任务进度的连接数，默认为线程数的一半
+    SSE_MAX_SECONDS      单个推送连接的最长秒数，到时由浏览器自动重连，默认 30
+"""
+
+import os
+import multiprocessing
+
+bind = os.environ.get('SERVER_BIND', '0.0.0.0:8888')
+workers = int(os.environ.get('SERVER_WORKERS', multiprocessing.cpu_count() + 1))
+# 线程worker：抓取、构建等阻塞IO的接口不会占满进程
+worker_class = 'gthread'
+# 任务进度推送（/api/jobs/<task_id>/events）在连接期间占用一个线程（最长 SSE_MAX_SECONDS，默认30秒）；
+# 每个worker最多 SSE_MAX_STREAMS 个推送连接（默认为线程数的一半），超出的客户端改为轮询。
+# 同时打开管理后台的人较多时调大线程数或 SSE_MAX_STREAMS
+threads = int(os.environ.get('SERVER_THREADS', '4'))
+
+# 在master中预先导入应用（Flask、爬虫、PDF处理等模块），fork后各worker共享已导入的代码页；
+# 文章存储和写线程在首次使用时才在各worker内创建，不会跨fork共享连接或线程
+preload_app = True
+
+# 处理一定数量的请求后平滑重启worker，加随机抖动避免同时重启
+max_requests = int(os.environ.get('SERVER_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('SERVER_TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', '120'))
+
+accesslog = '-'
+errorlog = '-'
+
+
+def worker_exit(server, worker):
+    """worker退出前（停止服务或按max_requests重启）等待仍在运行的后台任务"""
+    import server as app_server
+    remaining = app_server.wait_for_background(graceful_timeout)
+    if remaining:
+        server.log.warning(f"worker {worker.pid} 退出时仍有 {remaining} 个后台任务未完成")
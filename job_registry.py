@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务登记表
+周报生成、文章抓取、PDF解读、网站构建等后台任务的状态、进度和结果存放在SQLite
+（posts/store/jobs.db，WAL模式）中，而不是进程内的dict：
+
+- 多worker部署时，任务在哪个进程里运行，进度查询就可以落到任何一个进程
+- 服务重启（包括开发模式的自动重载）后已完成任务的结果仍可查询；
+  运行中任务的所属进程已退出时，查询到的状态为 interrupted
+- 已结束的任务超过 JOB_TTL_HOURS（默认24小时）后自动清除，登记表不会无限增长
+- 进度更新在事务中合并字段，多个线程/进程同时更新同一任务不会互相覆盖
+- 每次创建和更新都追加一条带递增序号的进度事件（job_events表），
+  SSE推送按序号读取，断线后可从 Last-Event-ID 之后继续
+"""
+
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+
+import serializer
+
+JOBS_DB = os.environ.get('JOBS_DB', os.path.join('posts', 'store', 'jobs.db'))
+# 已结束任务的保留时间
+JOB_TTL_SECONDS = float(os.environ.get('JOB_TTL_HOURS', '24')) * 3600
+
+# 任务结束状态
+FINISHED_STATUSES = ('completed', 'failed', 'interrupted')
+
+# 两次过期清理之间的最小间隔（秒）
+EVICT_INTERVAL = 60
+
+# 进度事件中的字段；文章、构建输出等结果不进事件，任务结束后通过get()读取
+EVENT_FIELDS = ('status', 'progress', 'message', 'details', 'error')
+
+
+def _owner():
+    """当前进程的标识：主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner):
+    """任务所属进程是否仍在运行；其他主机上的进程无法判断，视为仍在运行"""
+    host, _, pid = (owner or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRegistry:
+    """任务登记表：create() 创建任务，update() 合并更新字段，get() 读取任务
+
+    任务数据是一个dict（status、progress、message等），整体以JSON保存。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            owner TEXT NOT NULL DEFAULT ''
+        );
+        CREATE TABLE IF NOT EXISTS job_events (
+            job_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (job_id, seq)
+        );
+    """
+
+    def __init__(self, db_path=JOBS_DB, ttl=JOB_TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_evict = 0.0
+        self._stats = {'created': 0, 'updates': 0, 'evicted': 0, 'interrupted': 0}
+        # 本进程内有任务更新时唤醒等待事件的SSE连接；其他进程的更新由等待超时后的查询发现
+        self._changed = threading.Condition()
+
+    def _conn(self):
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.SCHEMA)
+            self._migrate(conn)
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        """早期创建的表没有owner列"""
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+        if 'owner' not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_updated ON jobs(status, updated_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_kind_created ON jobs(kind, created_at)')
+
+    def create(self, kind, fields):
+        """登记一个由当前进程执行的新任务，返回任务ID"""
+        self.evict_expired()
+        job_id = str(uuid.uuid4())
+        data = dict(fields)
+        data.setdefault('status', 'running')
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, status, data, created_at, updated_at, owner) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, data['status'], serializer.dumps_str(data), now, now, _owner())
+            )
+            self._append_event(conn, job_id, data, now)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._stats['created'] += 1
+        self._notify()
+        return job_id
+
+    def update(self, job_id, fields):
+        """把字段合并进任务数据，任务不存在时返回False"""
+        conn = self._conn()
+        # IMMEDIATE事务：读-改-写期间其他线程和进程不能写入，并发更新按顺序合并
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                conn.execute('ROLLBACK')
+                return False
+            data = serializer.loads(row['data'])
+            data.update(fields)
+            now = time.time()
+            conn.execute('UPDATE jobs SET status = ?, data = ?, updated_at = ? WHERE id = ?',
+                         (data['status'], serializer.dumps_str(data), now, job_id))
+            self._append_event(conn, job_id, data, now)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._stats['updates'] += 1
+        self._notify()
+        return True
+
+    def _append_event(self, conn, job_id, data, now):
+        """在同一事务中追加进度事件，序号按任务递增"""
+        event = {field: data.get(field) for field in EVENT_FIELDS}
+        conn.execute(
+            'INSERT INTO job_events (job_id, seq, data, created_at) '
+            'SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ? FROM job_events WHERE job_id = ?',
+            (job_id, serializer.dumps_str(event), now, job_id)
+        )
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def events(self, job_id, after=0):
+        """序号大于after的进度事件，返回 [(序号, 事件), ...]"""
+        rows = self._conn().execute(
+            'SELECT seq, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq', (job_id, after)
+        ).fetchall()
+        return [(row['seq'], serializer.loads(row['data'])) for row in rows]
+
+    def wait(self, timeout):
+        """等待本进程内的任务更新，最多timeout秒"""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def progress_callback(self, job_id):
+        """返回 progress_callback(progress, message, details)，供PDFProcessor、爬虫等报告进度"""
+        def callback(progress, message, details=''):
+            self.update(job_id, {'progress': progress, 'message': message, 'details': details})
+        return callback
+
+    def _row_to_job(self, row):
+        data = serializer.loads(row['data'])
+        if data['status'] == 'running' and not _owner_alive(row['owner']):
+            # 执行任务的进程已退出（服务重启或worker被回收），任务不会再有进展
+            data.update(status='interrupted', error=data.get('error') or '服务重启，任务已中断')
+            self.update(row['id'], {'status': 'interrupted', 'error': data['error']})
+            self._stats['interrupted'] += 1
+        data['id'] = row['id']
+        data['kind'] = row['kind']
+        return data
+
+    def get(self, job_id):
+        """读取任务数据（含id、kind），不存在时返回None"""
+        row = self._conn().execute('SELECT id, kind, data, owner FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, kind=None, limit=50):
+        """最近创建的任务，新的在前"""
+        sql = 'SELECT id, kind, data, owner FROM jobs'
+        params = []
+        if kind is not None:
+            sql += ' WHERE kind = ?'
+            params.append(kind)
+        sql += ' ORDER BY created_at DESC LIMIT ?'
+        params.append(limit)
+        return [self._row_to_job(row) for row in self._conn().execute(sql, params).fetchall()]
+
+    def evict_expired(self, force=False):
+        """删除结束超过TTL的任务，返回删除数量；未强制时每EVICT_INTERVAL秒最多执行一次"""
+        now = time.time()
+        if not force and now - self._last_evict < EVICT_INTERVAL:
+            return 0
+        self._last_evict = now
+        conn = self._conn()
+        placeholders = ','.join('?' * len(FINISHED_STATUSES))
+        removed = conn.execute(
+            f'DELETE FROM jobs WHERE status IN ({placeholders}) AND updated_at < ?',
+            (*FINISHED_STATUSES, now - self.ttl)
+        ).rowcount
+        # 所属进程已退出、长期停在running的任务同样清除
+        stale = [(row['id'],) for row in conn.execute(
+            "SELECT id, owner FROM jobs WHERE status = 'running' AND updated_at < ?", (now - self.ttl,)
+        ).fetchall() if not _owner_alive(row['owner'])]
+        conn.executemany('DELETE FROM jobs WHERE id = ?', stale)
+        removed += len(stale)
+        if removed:
+            conn.execute('DELETE FROM job_events WHERE job_id NOT IN (SELECT id FROM jobs)')
+        self._stats['evicted'] += removed
+        return removed
+
+    def stats(self):
+        counts = {row['status']: row['count'] for row in self._conn().execute(
+            'SELECT status, COUNT(*) AS count FROM jobs GROUP BY status')}
+        return dict(self._stats, jobs=counts, ttl_hours=self.ttl / 3600)
@@ -6,7 +6,6 @@ PDF文档处理模块
 """
 
 import os
-import json
 import hashlib
 import time
 from datetime import datetime
@@ -16,6 +15,9 @@ import requests
 from werkzeug.utils import secure_filename
 from openai import OpenAI
 
+from article_store import ingest_articles, export_articles_json
+from article_model import Article, derive_fields
+
 class PDFProcessor:
     def __init__(self):
         # 创建上传目录
@@ -356,7 +358,8 @@ PDF内容（前2000字符）：
                 'content': content,
                 'pdf_path': pdf_path,  # 保存PDF路径用于下载
                 'original_filename': os.path.basename(pdf_path),
-                'download_link': download_link  # 保存自定义下载链接
+                'download_link': download_link,  # 保存自定义下载链接
+                **derive_fields(content)
             }
             
             # 生成HTML文件
@@ -423,41 +426,8 @@ PDF内容（前2000字符）：
             print(f"❌ 生成HTML文件失败: {str(e)}")
     
     def update_articles_json(self, new_article):
-        """更新articles.json文件"""
-        try:
-            json_file = 'posts/articles.json'
-            
-            # 读取现有文章
-            if os.path.exists(json_file):
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    articles = json.load(f)
-            else:
-                articles = []
-            
-            # 检查是否已存在相同ID的文章
-            existing_ids = [article.get('id') for article in articles]
-            if new_article['id'] in existing_ids:
-                # 更新现有文章
-                for i, article in enumerate(articles):
-                    if article.get('id') == new_article['id']:
-                        articles[i] = new_article
-                        print(f"✅ 更新了现有文章: {new_article['title']}")
-                        break
-            else:
-                # 添加新文章到开头
-                articles.insert(0, new_article)
-                print(f"✅ 添加了新文章: {new_article['title']}")
-            
-            # 保存文件
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(articles, f, ensure_ascii=False, indent=2)
-            
-            print(f"📝 已更新 {json_file}")
-            return True
-            
-        except Exception as e:
-            print(f"❌ 更新JSON文件失败: {e}")
-            return False
+        """将文章写入文章存储（已存在则更新，否则添加到开头）"""
+        return ingest_articles([Article.from_dict(new_article)]) is not None
     
     def generate_weekly_report(self, articles_data, progress_callback=None):
         """生成周报"""
@@ -642,7 +612,8 @@ PDF内容（前2000字符）：
                 'url': '#',
                 'date': datetime.now().strftime('%Y-%m-%d'),
                 'tags': ['AI周报', '趋势分析', '行业动态', '自动生成'],
-                'content': report_content
+                'content': report_content,
+                **derive_fields(report_content)
             }
             
             if progress_callback:
@@ -835,7 +806,7 @@ def main():
         confirm = input("\n是否将此文章添加到网站? (y/n): ").strip().lower()
         
         if confirm in ['y', 'yes', '是', '确定']:
-            if processor.update_articles_json(article_data):
+            if processor.update_articles_json(article_data) and export_articles_json():
                 print("\n🎉 文章已成功添加到网站!")
                 print("请刷新浏览器查看更新后的内容。")
             else:
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章模型内存对比
+用tracemalloc对比合成语料（默认1万篇）以不同形式常驻内存时的占用：
+含正文的dict列表（原articles.json整体加载）、仅元数据的dict列表（load_articles()）、
+Article模型列表（load_article_models()，正文惰性加载）
+
+用法: python3 scripts/bench_article_model.py [articles.json路径] [--count N] [--skip-content]
+"""
+
+import os
+import sys
+import gc
+import argparse
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+import serializer
+from article_model import Article
+
+
+def synthetic_corpus(articles, count):
+    """循环复制现有文章生成count篇合成语料，每篇使用新的id"""
+    corpus = []
+    for i in range(count):
+        item = dict(articles[i % len(articles)])
+        item['id'] = f"{item.get('id', '')}-syn{i}"
+        corpus.append(item)
+    return corpus
+
+
+def without_content(articles):
+    return [{key: value for key, value in article.items() if key != 'content'} for article in articles]
+
+
+def measure(label, build, data):
+    """从序列化字节解析并构建列表，返回构建完成后仍常驻的字节数"""
+    gc.collect()
+    tracemalloc.start()
+    result = build(data)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28}{len(result):>8}{current / 1024 / 1024:>14.2f}{peak / 1024 / 1024:>14.2f}")
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文章模型内存对比')
+    parser.add_argument('path', nargs='?', default=os.path.join(ROOT_DIR, 'posts', 'articles.json'))
+    parser.add_argument('--count', type=int, default=10000, help='合成语料的文章数')
+    parser.add_argument('--skip-content', action='store_true', help='跳过含正文的dict（1万篇约需2GB内存）')
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(serializer.load_file(args.path), args.count)
+    full_data = None if args.skip_content else serializer.dumps(corpus)
+    meta_data = serializer.dumps(without_content(corpus))
+    del corpus
+
+    print(f"📊 {args.count} 篇合成语料（JSON后端: {serializer.BACKEND}）")
+    print(f"{'形式':<28}{'篇数':>8}{'常驻(MB)':>14}{'峰值(MB)':>14}")
+    full = None if full_data is None else measure('dict（含正文）', serializer.loads, full_data)
+    meta = measure('dict（仅元数据）', serializer.loads, meta_data)
+    model = measure('Article（正文惰性加载）',
+                    lambda data: [Article.from_dict(item) for item in serializer.loads(data)], meta_data)
+
+    if full:
+        print(f"\nArticle 相比含正文dict节省 {(1 - model / full) * 100:.1f}%")
+    print(f"Article 相比仅元数据dict节省 {(1 - model / meta) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
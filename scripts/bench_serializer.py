@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON序列化基准测试
+对比标准库json与orjson在当前articles.json和10倍合成语料上的加载/导出耗时
+
+用法: python3 scripts/bench_serializer.py [articles.json路径] [--repeat N]
+"""
+
+import os
+import json
+import time
+import argparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def stdlib_dumps(obj, pretty):
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def stdlib_loads(data):
+    return json.loads(data.decode('utf-8'))
+
+
+def orjson_dumps(obj, pretty):
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+
+def synthetic_corpus(articles, factor=10):
+    """复制现有文章生成合成语料，每份副本使用新的id"""
+    corpus = []
+    for copy in range(factor):
+        for article in articles:
+            item = dict(article)
+            item['id'] = f"{article.get('id', '')}-syn{copy}"
+            corpus.append(item)
+    return corpus
+
+
+def best_of(func, repeat):
+    """取多次运行中的最短耗时（毫秒）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench(label, articles, repeat):
+    backends = [('stdlib', stdlib_dumps, stdlib_loads)]
+    if orjson is not None:
+        backends.append(('orjson', orjson_dumps, orjson.loads))
+
+    print(f"\n📊 {label}: {len(articles)} 篇文章")
+    print(f"{'后端':<8}{'格式':<8}{'大小(KB)':>12}{'dump(ms)':>12}{'load(ms)':>12}")
+    for name, dumps, loads in backends:
+        for pretty in (False, True):
+            data = dumps(articles, pretty)
+            dump_ms = best_of(lambda: dumps(articles, pretty), repeat)
+            load_ms = best_of(lambda: loads(data), repeat)
+            fmt = 'pretty' if pretty else 'compact'
+            print(f"{name:<8}{fmt:<8}{len(data) / 1024:>12.1f}{dump_ms:>12.2f}{load_ms:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON序列化基准测试')
+    parser.add_argument('path', nargs='?', default=os.path.join(ROOT_DIR, 'posts', 'articles.json'))
+    parser.add_argument('--repeat', type=int, default=5, help='每项测试运行次数，取最短耗时')
+    args = parser.parse_args()
+    path, repeat = args.path, args.repeat
+
+    with open(path, 'rb') as f:
+        articles = stdlib_loads(f.read())
+
+    if orjson is None:
+        print("⚠️ 未安装orjson，仅测试标准库（pip install orjson）")
+
+    bench(os.path.basename(path), articles, repeat)
+    bench('10倍合成语料', synthetic_corpus(articles), repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 import os
 import re
+import sys
+import html
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from article_store import get_store, export_articles_json
+from article_model import find_cover_image
+from compression import precompress_files, print_report
 
 def get_article_icon(article):
     """根据文章类型返回对应的图标"""
@@ -30,23 +38,16 @@ def get_article_icon(article):
     elif (article_id.startswith('wechat-') or 
           '公众号' in source or 
           source in ['关注前沿科技', '微信公众号', '数字生命卡兹克', '博阳']):
-        # 从文章中提取第一张图片作为封面
-        content = article.get('content', '')
-        # 尝试多种图片匹配模式
-        img_patterns = [
-            r'<img[^>]+src="([^"]+)"',
-            r'data-src="([^"]+)"',
-            r'src="([^"]+)"'
-        ]
+        # 使用写入时派生的封面图，尚未回填的旧文章才从正文中提取第一张图片
+        img_src = article.cover_image
+        if img_src is None:
+            img_src = find_cover_image(article.content)
         
-        for pattern in img_patterns:
-            img_match = re.search(pattern, content)
-            if img_match:
-                img_src = img_match.group(1)
-                # 确保图片路径正确
-                if not img_src.startswith('http') and not img_src.startswith('./'):
-                    img_src = './' + img_src
-                return f'<img src="{img_src}" class="cover-image" alt="封面图">'
+        if img_src:
+            # 确保图片路径正确
+            if not img_src.startswith('http') and not img_src.startswith('./'):
+                img_src = './' + img_src
+            return f'<img src="{img_src}" class="cover-image" alt="封面图">'
         
         # 如果没有找到图片，使用默认公众号图标
         return '📱'
@@ -80,20 +81,27 @@ def build_simple_edgeone_site():
     """为EdgeOne Pages构建简化的白蓝色像素风网站"""
     print("🏗️  为EdgeOne Pages构建白蓝色像素风网站...")
     
-    # 读取文章数据 (从项目根目录)
-    with open('posts/articles.json', 'r', encoding='utf-8') as f:
-        articles = json.load(f)
-    
-    print(f"📚 找到 {len(articles)} 篇文章")
-    
-    # 1. 创建白蓝色像素风主页
-    create_homepage(articles)
-    
-    # 2. 创建白蓝色像素风样式
-    create_styles()
+    # 固定一个文章版本，整个构建过程读取同一份一致的数据；Article的正文在生成页面时才逐篇读取
+    with get_store().snapshot() as snapshot:
+        # 主页按文章日期从新到旧排列，不依赖写入顺序
+        articles = snapshot.articles(by_date=True)
+        
+        print(f"📚 找到 {len(articles)} 篇文章")
+        
+        # 0. 导出前端使用的articles.json
+        export_articles_json(snapshot=snapshot)
+        
+        # 1. 创建白蓝色像素风主页
+        create_homepage(articles)
+        
+        # 2. 创建白蓝色像素风样式
+        create_styles()
+        
+        # 3. 创建修复了图片路径的独立文章页面
+        create_article_pages(articles)
     
-    # 3. 创建修复了图片路径的独立文章页面
-    create_article_pages(articles)
+    # 4. 为文本文件生成 .br/.gz 预压缩版本，服务器直接发送
+    print_report(precompress_files())
     
     print("\n🎉 EdgeOne Pages构建完成！")
 
@@ -104,11 +112,14 @@ def create_homepage(articles):
             # 获取图标和图片
             icon_content = get_article_icon(article)
             is_image = '<img' in icon_content and 'cover-image' in icon_content
+            # 搜索用文本：标题、标签和写入时派生的正文纯文本
+            search_text = html.escape(' '.join([article.get('title', ''), *article.get('tags', []),
+                                                article.get('plain_text', '')]).lower(), quote=True)
             
             if is_image:
                 # 如果有图片，将图片包装在链接中
                 articles_html += f"""
-                <div class="pixel-card" data-tags='{",".join(article.get("tags", [])[:4])}'>
+                <div class="pixel-card" data-tags='{",".join(article.get("tags", [])[:4])}' data-search="{search_text}">
                     <div class="card-image-container">
                         <a href="articles/{article['id']}.html" class="image-link">
                             {icon_content}
@@ -132,7 +143,7 @@ def create_homepage(articles):
             else:
                 # 如果没有图片，显示图标
                 articles_html += f"""
-                <div class="pixel-card" data-tags='{",".join(article.get("tags", [])[:4])}'>
+                <div class="pixel-card" data-tags='{",".join(article.get("tags", [])[:4])}' data-search="{search_text}">
                     <div class="card-image-container">
                         <div class="pixel-icon">
                             {icon_content}
@@ -248,10 +259,8 @@ def create_homepage(articles):
             const cards = document.querySelectorAll('.pixel-card');
             
             cards.forEach(card => {{
-                const title = card.querySelector('.pixel-title').textContent.toLowerCase();
-                const tags = card.querySelector('.hover-tags').textContent.toLowerCase();
-                
-                if (title.includes(searchTerm) || tags.includes(searchTerm)) {{
+                // 构建时写入的搜索文本（标题、标签、正文纯文本），不再逐张卡片读取DOM
+                if (card.dataset.search.includes(searchTerm)) {{
                     card.style.display = 'block';
                 }} else {{
                     card.style.display = searchTerm ? 'none' : 'block';
@@ -1264,7 +1273,7 @@ def create_article_pages(articles):
         print(f"📝 创建文章页面: {article['title'][:30]}...")
         
         # 使用正则表达式修复图片路径和可见性问题
-        content = article['content']
+        content = article.content
         # 修复转义的换行符和引号
         content = content.replace('\\n', '\n')
         content = content.replace('\\"', '"')
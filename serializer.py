@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON序列化模块
+文章数据的统一编解码入口：安装了orjson时使用orjson，否则回退到标准库json
+
+默认输出紧凑格式（无缩进、UTF-8直出不转义中文）；
+pretty=True 或设置环境变量 ARTICLE_JSON_PRETTY=1 时输出2空格缩进，便于人工对比差异。
+设置 ARTICLE_JSON_BACKEND=stdlib 可强制使用标准库。
+"""
+
+import os
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_requested_backend = os.environ.get('ARTICLE_JSON_BACKEND', '').lower()
+BACKEND = 'orjson' if orjson is not None and _requested_backend != 'stdlib' else 'stdlib'
+
+# 导出文件是否默认使用缩进格式
+PRETTY_DEFAULT = os.environ.get('ARTICLE_JSON_PRETTY', '') in ('1', 'true', 'yes')
+
+
+def dumps(obj, pretty=False, default=None):
+    """序列化为UTF-8字节串"""
+    if BACKEND == 'orjson':
+        # 与标准库行为保持一致：允许非字符串键
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=default).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=default).encode('utf-8')
+
+
+def dumps_str(obj, pretty=False, default=None):
+    """序列化为字符串"""
+    return dumps(obj, pretty=pretty, default=default).decode('utf-8')
+
+
+def loads(data):
+    """从字节串或字符串反序列化"""
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode('utf-8')
+    return json.loads(data)
+
+
+def load_file(path):
+    """读取并解析JSON文件"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
@@ -6,16 +6,18 @@
 """
 
 import os
-import json
 import subprocess
 import asyncio
 import threading
 import time
-import uuid
-from datetime import datetime
+import functools
+import mimetypes
+from datetime import datetime, timezone
 from pathlib import Path
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file, make_response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.utils import safe_join
 import sys
 
 # 添加当前目录到Python路径
@@ -24,38 +26,146 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # 导入爬虫模块
 from crawler import WeChatArticleCrawler
 from pdf_processor import PDFProcessor
+from article_store import (get_store, get_writer, load_article_models, ingest_articles,
+                           export_articles_json, invalidate_cache, iso_week_range, restore_article_version)
+from article_model import Article
+import serializer
+import compression
+from job_registry import JobRegistry, FINISHED_STATUSES
+
+
+class ArticleJSONProvider(DefaultJSONProvider):
+    """接口响应统一走serializer（有orjson时用orjson），调试模式下仍输出缩进格式"""
+
+    def dumps(self, obj, **kwargs):
+        return serializer.dumps_str(obj, pretty=kwargs.get('indent') is not None, default=self.default)
+
+    @staticmethod
+    def default(obj):
+        # Article按现有JSON结构输出（不含正文）
+        if isinstance(obj, Article):
+            return obj.to_dict()
+        return DefaultJSONProvider.default(obj)
+
+    def loads(self, s, **kwargs):
+        return serializer.loads(s)
+
 
 app = Flask(__name__)
+app.json = ArticleJSONProvider(app)
 CORS(app)  # 允许跨域请求
+compression.init_app(app)  # 按Accept-Encoding压缩JSON和文本响应
 
 # 配置
-ARTICLES_FILE = 'posts/articles.json'
 IMAGES_DIR = 'images'
 
-# 任务状态存储
-report_tasks = {}
+# 后台任务（周报生成、文章抓取）状态存储（SQLite，多个worker进程共享）
+jobs = JobRegistry()
 
-def load_articles():
-    """加载文章数据"""
-    try:
-        if os.path.exists(ARTICLES_FILE):
-            with open(ARTICLES_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
-    except Exception as e:
-        print(f"加载文章失败: {e}")
-        return []
+# 任务进度推送（SSE）：无新事件时的心跳间隔、跨进程查询新事件的间隔、单个连接的最长时间
+# 每个连接在推送期间占用一个worker线程：连接到时关闭，浏览器按retry自动重连并通过
+# Last-Event-ID 从断点继续；每个worker同时推送的连接数有上限（默认为线程数的一半），
+# 超出时返回503，客户端改为轮询 /api/jobs/<task_id>，其余线程始终留给普通请求
+SSE_HEARTBEAT_SECONDS = 15
+SSE_POLL_SECONDS = 0.5
+SSE_MAX_SECONDS = int(os.environ.get('SSE_MAX_SECONDS', '30'))
+SSE_RETRY_MS = 2000
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', max(1, int(os.environ.get('SERVER_THREADS', '4')) // 2)))
+sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
 
-def save_articles(articles):
-    """保存文章数据"""
-    try:
-        os.makedirs(os.path.dirname(ARTICLES_FILE), exist_ok=True)
-        with open(ARTICLES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(articles, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        print(f"保存文章失败: {e}")
-        return False
+# 正在运行的后台任务线程，worker退出前等待它们结束
+background_threads = set()
+background_lock = threading.Lock()
+
+def start_background(target, *args):
+    """在后台线程中执行任务"""
+    def run():
+        try:
+            target(*args)
+        finally:
+            with background_lock:
+                background_threads.discard(thread)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    with background_lock:
+        background_threads.add(thread)
+    thread.start()
+    return thread
+
+def run_job(kind, target, *args, message='任务已启动', details=''):
+    """登记一个后台任务并在后台线程中执行 target(task_id, *args)，返回任务ID
+
+    target 通过 jobs.update / jobs.progress_callback 报告进度和结果；未捕获的异常记为任务失败
+    """
+    task_id = jobs.create(kind, {
+        'status': 'running',
+        'progress': 0,
+        'message': message,
+        'details': details,
+        'start_time': time.time(),
+        'article': None,
+        'error': None
+    })
+    
+    def run():
+        try:
+            target(task_id, *args)
+        except Exception as e:
+            print(f"后台任务 {kind} 失败: {e}")
+            jobs.update(task_id, {
+                'status': 'failed',
+                'error': str(e)
+            })
+    
+    start_background(run)
+    return task_id
+
+def wait_for_background(timeout):
+    """等待后台任务结束（优雅退出时调用），返回仍未结束的任务数"""
+    deadline = time.monotonic() + timeout
+    with background_lock:
+        threads = list(background_threads)
+    for thread in threads:
+        thread.join(max(0, deadline - time.monotonic()))
+    return sum(thread.is_alive() for thread in threads)
+
+def store_conditional(variant=None):
+    """按存储数据版本做条件GET的装饰器
+
+    响应带 ETag（数据版本号）和 Last-Modified；请求的 If-None-Match / If-Modified-Since
+    与当前版本一致时直接返回304，不调用接口函数，也不加载和序列化数据。
+    variant() 返回响应还依赖的其他取值（如当天日期），拼入ETag。
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # 先取版本再生成数据：期间若有写入，响应比ETag新，下次请求会因版本不符重新获取
+            version, modified = get_store().data_version()
+            etag = f"v{version}" + (f"-{variant()}" if variant else '')
+            last_modified = datetime.fromtimestamp(int(modified), timezone.utc) if modified else None
+            if request.if_none_match:
+                # 压缩后的响应带弱ETag，按弱比较判断
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                # Last-Modified只反映存储版本，响应还依赖其他取值时不能只凭时间判断
+                not_modified = (variant is None and last_modified is not None
+                                and request.if_modified_since is not None
+                                and last_modified <= request.if_modified_since)
+            if not_modified:
+                response = app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # 允许浏览器缓存，但每次使用前都要带着ETag重新验证
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
 
 def run_git_command(command):
     """执行Git命令"""
@@ -75,15 +185,125 @@ def admin():
     """管理后台"""
     return send_from_directory('.', 'admin.html')
 
+def parse_date_range(args):
+    """解析 from/to（YYYY-MM-DD）、week（如2025-W41）和 limit 查询参数
+
+    返回 (start, end, limit)；参数格式错误时抛出ValueError
+    """
+    start, end = args.get('from') or None, args.get('to') or None
+    for value in (start, end):
+        if value is not None:
+            datetime.strptime(value, '%Y-%m-%d')
+    week = args.get('week')
+    if week:
+        year, _, number = week.upper().partition('-W')
+        start, end = iso_week_range(int(year), int(number))
+    limit = args.get('limit')
+    limit = int(limit) if limit else None
+    if limit is not None and limit < 0:
+        raise ValueError('limit不能为负数')
+    return start, end, limit
+
+def parse_fields(args):
+    """解析 fields 查询参数（逗号分隔的字段名），未指定时返回None（除正文外的全部字段）"""
+    fields = [field.strip() for field in (args.get('fields') or '').split(',') if field.strip()]
+    if not fields:
+        return None
+    # 游标和链接都依赖id，始终返回
+    return ['id'] + [field for field in fields if field != 'id']
+
+def project_article(article, fields):
+    """只保留请求的字段；请求了content时读取正文"""
+    if fields is None:
+        return article
+    projected = {field: article[field] for field in fields if field in article}
+    if 'content' in fields and 'content' not in article:
+        projected['content'] = get_store().get_content(article['id'])
+    return projected
+
+# 任务结果和生成接口只返回文章摘要，正文通过 /api/articles/<id> 读取
+ARTICLE_SUMMARY_FIELDS = ('id', 'title', 'source', 'date')
+
+def article_summary(article):
+    """文章的摘要字段，不含正文（任务登记表和进度查询不重复保存、序列化正文）"""
+    return project_article(article, ARTICLE_SUMMARY_FIELDS)
+
 @app.route('/api/articles', methods=['GET'])
+@store_conditional()
 def get_articles():
-    """获取文章列表"""
+    """获取文章列表（默认不含正文）
+
+    可选参数：
+    - limit/after：按展示顺序分页，after为上一页返回的next_cursor
+    - fields：逗号分隔的返回字段，如 id,title,date,tags（可包含content）
+    - source/tag：按来源、标签筛选
+    - from/to（YYYY-MM-DD，含两端）、week（ISO周，如2025-W41）：按日期索引查询，
+      结果按日期从新到旧排列，此时limit为最多返回篇数
+    """
     try:
-        articles = load_articles()
+        try:
+            start, end, limit = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'日期参数格式错误: {e}'
+            }), 400
+        
+        fields = parse_fields(request.args)
+        source = request.args.get('source') or None
+        tag = request.args.get('tag') or None
+        after = request.args.get('after') or None
+        next_cursor = None
+        if start is not None or end is not None:
+            if after is not None:
+                return jsonify({
+                    'success': False,
+                    'error': '按日期查询时不支持after分页'
+                }), 400
+            if source is None and tag is None:
+                articles = get_store().articles_between(start, end, limit)
+            else:
+                articles = [article for article in get_store().articles_between(start, end)
+                            if (source is None or article.get('source') == source)
+                            and (tag is None or tag in (article.get('tags') or []))][:limit]
+        else:
+            try:
+                articles, next_cursor = get_store().page_articles(limit, after, source, tag)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        articles = [project_article(article, fields) for article in articles]
         return jsonify({
             'success': True,
             'articles': articles,
-            'count': len(articles)
+            'count': len(articles),
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/articles/<article_id>', methods=['GET'])
+@store_conditional()
+def get_article(article_id):
+    """获取单篇文章（含正文），可用fields参数只取部分字段"""
+    try:
+        fields = parse_fields(request.args)
+        with_content = fields is None or 'content' in fields
+        article = get_store().get_article(article_id, with_content=with_content)
+        if article is None:
+            return jsonify({
+                'success': False,
+                'error': '文章不存在'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'article': project_article(article, fields)
         })
     except Exception as e:
         return jsonify({
@@ -95,15 +315,8 @@ def get_articles():
 def delete_article(article_id):
     """删除文章"""
     try:
-        articles = load_articles()
-        original_count = len(articles)
-        
-        # 找到要删除的文章
-        article_to_delete = None
-        for article in articles:
-            if article.get('id') == article_id:
-                article_to_delete = article
-                break
+        # 删除文章记录
+        article_to_delete = get_writer().delete_article(article_id)
         
         if not article_to_delete:
             return jsonify({
@@ -111,9 +324,6 @@ def delete_article(article_id):
                 'error': '文章不存在'
             }), 404
         
-        # 删除文章
-        articles = [article for article in articles if article.get('id') != article_id]
-        
         # 删除本地文件
         deleted_files = []
         
@@ -122,6 +332,7 @@ def delete_article(article_id):
         if os.path.exists(html_file):
             try:
                 os.remove(html_file)
+                compression.remove_precompressed(html_file)
                 deleted_files.append(f"HTML文件: {html_file}")
             except Exception as e:
                 print(f"删除HTML文件失败: {e}")
@@ -136,23 +347,84 @@ def delete_article(article_id):
                 except Exception as e:
                     print(f"删除PDF文件失败: {e}")
         
-        # 保存更新后的文章列表
-        if save_articles(articles):
-            message = '文章删除成功'
-            if deleted_files:
-                message += f'，已删除本地文件: {", ".join(deleted_files)}'
+        message = '文章删除成功'
+        if deleted_files:
+            message += f'，已删除本地文件: {", ".join(deleted_files)}'
+        
+        return jsonify({
+            'success': True,
+            'message': message,
+            'deleted_files': deleted_files
+        })
             
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/articles/<article_id>/versions', methods=['GET'])
+@store_conditional()
+def get_article_versions(article_id):
+    """列出文章的历史版本（最新的在前）"""
+    try:
+        if get_store().get_article(article_id) is None:
             return jsonify({
-                'success': True,
-                'message': message,
-                'deleted_files': deleted_files
-            })
-        else:
+                'success': False,
+                'error': '文章不存在'
+            }), 404
+        
+        versions = get_store().history(article_id)
+        return jsonify({
+            'success': True,
+            'versions': versions,
+            'count': len(versions)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/articles/<article_id>/versions/<int:version>', methods=['GET'])
+@store_conditional()
+def get_article_version(article_id, version):
+    """获取文章某个历史版本的完整内容"""
+    try:
+        article = get_store().get_version(article_id, version)
+        if article is None:
             return jsonify({
                 'success': False,
-                'error': '保存失败'
-            }), 500
-            
+                'error': '历史版本不存在'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'version': version,
+            'article': article
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/articles/<article_id>/versions/<int:version>/restore', methods=['POST'])
+def restore_article(article_id, version):
+    """把文章恢复为某个历史版本，当前版本会保存为新的历史版本"""
+    try:
+        article = restore_article_version(article_id, version)
+        if article is None:
+            return jsonify({
+                'success': False,
+                'error': '历史版本不存在'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': f'已恢复到版本 {version}',
+            'article': article
+        })
     except Exception as e:
         return jsonify({
             'success': False,
@@ -184,11 +456,8 @@ def update_article():
                 'error': '缺少文章标题'
             }), 400
         
-        # 加载文章列表
-        articles = load_articles()
-        
         # 查找文章
-        article = next((a for a in articles if a['id'] == article_id), None)
+        article = get_store().get_article(article_id)
         if not article:
             return jsonify({
                 'success': False,
@@ -196,32 +465,32 @@ def update_article():
             }), 404
         
         # 更新文章信息
-        article['title'] = title
+        fields = {'title': title}
         if source:
-            article['source'] = source
+            fields['source'] = source
         if summary:
-            article['summary'] = summary
+            fields['summary'] = summary
         if url:
-            article['url'] = url
+            fields['url'] = url
         if date:
-            article['date'] = date
+            fields['date'] = date
         if download_link:
-            article['download_link'] = download_link
+            fields['download_link'] = download_link
             # 如果是论文解读文章，也更新URL为下载链接
-            if article.get('source') == '论文解读':
-                article['url'] = download_link
+            if fields.get('source', article.get('source')) == '论文解读':
+                fields['url'] = download_link
         
-        # 保存文章列表
-        if save_articles(articles):
-            return jsonify({
-                'success': True,
-                'message': '文章更新成功'
-            })
-        else:
+        # 保存文章
+        if get_writer().update_article(article_id, fields) is None:
             return jsonify({
                 'success': False,
-                'error': '保存失败'
-            }), 500
+                'error': '文章不存在'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': '文章更新成功'
+        })
             
     except Exception as e:
         return jsonify({
@@ -243,31 +512,17 @@ def update_article_categories():
                 'error': '缺少文章ID'
             }), 400
         
-        # 加载文章列表
-        articles = load_articles()
-        
-        # 查找文章
-        article = next((a for a in articles if a['id'] == article_id), None)
-        if not article:
+        # 更新标签
+        if get_writer().update_article(article_id, {'tags': tags}) is None:
             return jsonify({
                 'success': False,
                 'error': '文章不存在'
             }), 404
         
-        # 更新标签
-        article['tags'] = tags
-        
-        # 保存文章列表
-        if save_articles(articles):
-            return jsonify({
-                'success': True,
-                'message': '分类更新成功'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': '保存失败'
-            }), 500
+        return jsonify({
+            'success': True,
+            'message': '分类更新成功'
+        })
             
     except Exception as e:
         return jsonify({
@@ -309,8 +564,9 @@ def check_orphaned_files():
         import glob
         
         # 获取所有已上架的文章ID
-        articles = load_articles()
-        published_ids = set(article.get('id') for article in articles)
+        articles = load_article_models()
+        published_ids = {article.id for article in articles}
+        referenced_pdfs = {article.pdf_path for article in articles if article.pdf_path}
         
         orphaned_files = []
         
@@ -334,15 +590,8 @@ def check_orphaned_files():
         # 检查uploads/pdf目录下的PDF文件
         pdf_files = glob.glob('uploads/pdf/*.pdf')
         for pdf_file in pdf_files:
-            # 检查是否有文章引用这个PDF文件
-            is_referenced = False
-            for article in articles:
-                if article.get('pdf_path') == pdf_file:
-                    is_referenced = True
-                    break
-            
-            # 如果没有文章引用，标记为孤立文件
-            if not is_referenced:
+            # 如果没有文章引用这个PDF文件，标记为孤立文件
+            if pdf_file not in referenced_pdfs:
                 file_size = os.path.getsize(pdf_file)
                 orphaned_files.append({
                     'type': 'PDF文件',
@@ -382,41 +631,29 @@ def cleanup_selected_files():
         failed_files = []
         deleted_articles = []
         
-        # 加载文章列表
-        articles = load_articles()
-        articles_updated = False
-        
+        # 从文件路径中提取文章ID（去掉扩展名），对应的文章记录在一个事务中批量删除
+        existing_paths = []
         for file_path in file_paths:
+            if os.path.exists(file_path):
+                existing_paths.append(file_path)
+            else:
+                failed_files.append(f"文件不存在: {file_path}")
+        article_ids = [os.path.splitext(os.path.basename(file_path))[0] for file_path in existing_paths]
+        for article_id, removed in zip(article_ids, get_writer().delete_many(article_ids)):
+            if removed is not None:
+                deleted_articles.append(article_id)
+                print(f"从文章列表中删除文章: {article_id}")
+        
+        for file_path in existing_paths:
             try:
-                # 检查文件是否存在
-                if os.path.exists(file_path):
-                    # 从文件路径中提取文章ID
-                    filename = os.path.basename(file_path)
-                    article_id = os.path.splitext(filename)[0]  # 去掉扩展名
-                    
-                    # 从文章列表中删除对应的文章记录
-                    original_count = len(articles)
-                    articles = [article for article in articles if article.get('id') != article_id]
-                    
-                    if len(articles) < original_count:
-                        deleted_articles.append(article_id)
-                        articles_updated = True
-                        print(f"从文章列表中删除文章: {article_id}")
-                    
-                    # 删除文件
-                    os.remove(file_path)
-                    deleted_files.append(file_path)
-                else:
-                    failed_files.append(f"文件不存在: {file_path}")
+                # 删除文件
+                os.remove(file_path)
+                deleted_files.append(file_path)
             except Exception as e:
                 failed_files.append(f"删除失败 {file_path}: {str(e)}")
         
-        # 如果删除了文章记录，保存更新后的文章列表
-        if articles_updated:
-            if save_articles(articles):
-                print(f"文章列表已更新，删除了 {len(deleted_articles)} 个文章记录")
-            else:
-                print("警告：文件删除成功，但文章列表更新失败")
+        if deleted_articles:
+            print(f"文章列表已更新，删除了 {len(deleted_articles)} 个文章记录")
         
         message = f'清理完成，成功删除了 {len(deleted_files)} 个文件'
         if deleted_articles:
@@ -447,8 +684,9 @@ def cleanup_orphaned_files():
         import glob
         
         # 获取所有已上架的文章ID
-        articles = load_articles()
-        published_ids = set(article.get('id') for article in articles)
+        articles = load_article_models()
+        published_ids = {article.id for article in articles}
+        referenced_pdfs = {article.pdf_path for article in articles if article.pdf_path}
         
         deleted_files = []
         
@@ -470,15 +708,8 @@ def cleanup_orphaned_files():
         # 检查uploads/pdf目录下的PDF文件
         pdf_files = glob.glob('uploads/pdf/*.pdf')
         for pdf_file in pdf_files:
-            # 检查是否有文章引用这个PDF文件
-            is_referenced = False
-            for article in articles:
-                if article.get('pdf_path') == pdf_file:
-                    is_referenced = True
-                    break
-            
-            # 如果没有文章引用，删除文件
-            if not is_referenced:
+            # 如果没有文章引用这个PDF文件，删除文件
+            if pdf_file not in referenced_pdfs:
                 try:
                     os.remove(pdf_file)
                     deleted_files.append(f"PDF文件: {pdf_file}")
@@ -500,7 +731,7 @@ def cleanup_orphaned_files():
 
 @app.route('/api/crawl', methods=['POST'])
 def crawl_article():
-    """抓取文章"""
+    """抓取文章：在后台任务中执行，立即返回任务ID，进度和结果通过 /api/crawl-progress/<task_id> 查询"""
     try:
         data = request.get_json()
         url = data.get('url')
@@ -520,19 +751,40 @@ def crawl_article():
                 'error': '目前只支持微信公众号文章链接 (mp.weixin.qq.com)'
             }), 400
         
+        task_id = run_job('crawl', crawl_article_background, url, custom_title, custom_tags,
+                          message='开始抓取文章...', details=url)
+        
+        return jsonify({
+            'success': True,
+            'task_id': task_id,
+            'message': '文章抓取任务已启动'
+        })
+            
+    except Exception as e:
+        print(f"抓取文章错误: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def crawl_article_background(task_id, url, custom_title, custom_tags):
+    """后台抓取文章：抓取 → 解析 → 下载图片 → 保存"""
+    try:
+        progress_callback = jobs.progress_callback(task_id)
+        
         # 创建爬虫实例
         crawler = WeChatArticleCrawler()
         print(f"使用微信公众号爬虫抓取文章: {url}")
         
         # 抓取文章
-        print(f"开始抓取文章: {url}")
-        article_data = crawler.fetch_article_content(url)
+        article_data = crawler.fetch_article_content(url, progress_callback)
         
         if not article_data:
-            return jsonify({
-                'success': False,
+            jobs.update(task_id, {
+                'status': 'failed',
                 'error': '抓取文章失败'
-            }), 500
+            })
+            return
         
         # 应用自定义设置
         if custom_title:
@@ -547,42 +799,40 @@ def crawl_article():
             if tags:
                 article_data['tags'] = tags
         
-        # 加载现有文章
-        articles = load_articles()
-        
-        # 检查是否已存在
-        existing_ids = [article.get('id') for article in articles]
-        if article_data.get('id') in existing_ids:
-            # 更新现有文章
-            for i, article in enumerate(articles):
-                if article.get('id') == article_data.get('id'):
-                    articles[i] = article_data
-                    break
-            message = "文章已更新"
-        else:
-            # 添加新文章
-            articles.insert(0, article_data)  # 插入到开头
-            message = "文章添加成功"
+        jobs.update(task_id, {
+            'progress': 90,
+            'message': '正在保存文章...',
+            'details': article_data.get('title', '')
+        })
         
-        # 保存文章
-        if save_articles(articles):
-            return jsonify({
-                'success': True,
-                'message': message,
-                'article': article_data
-            })
-        else:
-            return jsonify({
-                'success': False,
+        # 保存文章（已存在则更新，否则插入到开头）
+        results = ingest_articles([article_data])
+        if results is None:
+            jobs.update(task_id, {
+                'status': 'failed',
                 'error': '保存文章失败'
-            }), 500
+            })
+            return
+        
+        jobs.update(task_id, {
+            'status': 'completed',
+            'progress': 100,
+            'message': "文章添加成功" if results[0] else "文章已更新",
+            'details': article_data.get('title', ''),
+            'article': article_summary(article_data)
+        })
             
     except Exception as e:
         print(f"抓取文章错误: {e}")
-        return jsonify({
-            'success': False,
+        jobs.update(task_id, {
+            'status': 'failed',
             'error': str(e)
-        }), 500
+        })
+
+@app.route('/api/crawl-progress/<task_id>', methods=['GET'])
+def get_crawl_progress(task_id):
+    """获取文章抓取进度，完成后返回抓取到的文章"""
+    return job_progress_response(task_id)
 
 @app.route('/api/git-status', methods=['GET'])
 def get_git_status():
@@ -596,7 +846,8 @@ def get_git_status():
         success, stdout, stderr = run_git_command('git status -sb')
         needs_push = 'ahead' in stdout if success else False
         
-        return jsonify({
+        # Git状态不受存储版本管理，按响应内容生成ETag，未变化时只回传304
+        response = jsonify({
             'success': True,
             'status': {
                 'has_changes': has_changes,
@@ -605,6 +856,9 @@ def get_git_status():
                 'up_to_date': not needs_push
             }
         })
+        response.add_etag()
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
         
     except Exception as e:
         return jsonify({
@@ -616,6 +870,13 @@ def get_git_status():
 def sync_to_git():
     """同步到Git"""
     try:
+        # 导出最新的articles.json，保证前端读取到的数据与存储一致
+        if not export_articles_json():
+            return jsonify({
+                'success': False,
+                'error': '导出文章数据失败'
+            }), 500
+        
         # 检查是否有未提交的更改
         success, stdout, stderr = run_git_command('git status --porcelain')
         if not success:
@@ -686,8 +947,8 @@ def sync_to_git():
 def clear_cache():
     """清除缓存"""
     try:
-        # 这里可以添加清除缓存的逻辑
-        # 比如清除临时文件、重置某些状态等
+        # 清除进程内文章缓存，下次读取时重新解析文章数据
+        invalidate_cache()
         
         return jsonify({
             'success': True,
@@ -701,21 +962,24 @@ def clear_cache():
         }), 500
 
 @app.route('/api/stats', methods=['GET'])
+# 今日新增随日期变化
+@store_conditional(lambda: datetime.now().strftime('%Y-%m-%d'))
 def get_stats():
     """获取统计信息"""
     try:
-        articles = load_articles()
+        articles = load_article_models()
         
-        # 计算今日新增文章
+        # 计算今日新增文章（日期索引查询，不扫描全部文章）
         today = datetime.now().strftime('%Y-%m-%d')
-        today_articles = [article for article in articles if article.get('date') == today]
+        today_articles = get_store().articles_between(today, today)
         
-        # 计算图片总数
+        # 计算图片总数：使用写入时派生的image_count，尚未回填的旧文章才读取正文计数
         total_images = 0
         for article in articles:
-            content = article.get('content', '')
-            # 简单计算img标签数量
-            total_images += content.count('<img')
+            if article.image_count is not None:
+                total_images += article.image_count
+            else:
+                total_images += article.content.count('<img')
         
         return jsonify({
             'success': True,
@@ -732,6 +996,23 @@ def get_stats():
             'error': str(e)
         }), 500
 
+@app.route('/api/storage-stats', methods=['GET'])
+def get_storage_stats():
+    """获取文章存储统计信息"""
+    try:
+        return jsonify({
+            'success': True,
+            'storage': get_store().stats(),
+            'writer': get_writer().stats(),
+            'jobs': jobs.stats()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # 简单邮件发送API
 @app.route('/api/send-email', methods=['POST'])
 def send_email():
@@ -770,10 +1051,19 @@ def send_email():
 # 构建网站API
 @app.route('/api/build-site', methods=['POST'])
 def build_site():
-    """构建网站"""
+    """构建网站
+
+    请求体 {"async": true} 时在后台任务中构建，立即返回任务ID，结果通过 /api/jobs/<task_id> 查询
+    """
     try:
-        import subprocess
-        import sys
+        data = request.get_json(silent=True) or {}
+        if data.get('async'):
+            task_id = run_job('build', build_site_background, message='开始构建网站...')
+            return jsonify({
+                'success': True,
+                'task_id': task_id,
+                'message': '网站构建任务已启动'
+            })
         
         # 运行构建脚本
         result = subprocess.run([sys.executable, 'build.py'], 
@@ -798,6 +1088,29 @@ def build_site():
             'error': str(e)
         }), 500
 
+def build_site_background(task_id):
+    """后台构建网站"""
+    jobs.update(task_id, {
+        'progress': 10,
+        'message': '正在构建网站...',
+        'details': '运行 build.py'
+    })
+    result = subprocess.run([sys.executable, 'build.py'], capture_output=True, text=True, cwd='.')
+    if result.returncode == 0:
+        jobs.update(task_id, {
+            'status': 'completed',
+            'progress': 100,
+            'message': '网站构建成功',
+            'details': '',
+            'result': {'output': result.stdout}
+        })
+    else:
+        jobs.update(task_id, {
+            'status': 'failed',
+            'error': f'构建失败: {result.stderr}',
+            'result': {'output': result.stdout}
+        })
+
 # PDF处理相关API
 @app.route('/api/upload-pdf', methods=['POST'])
 def upload_pdf():
@@ -833,6 +1146,16 @@ def upload_pdf():
                 'error': error
             }), 400
         
+        if request.form.get('async') == 'true':
+            # 文件已保存，解读（调用大模型）在后台任务中进行，结果通过 /api/jobs/<task_id> 查询
+            task_id = run_job('pdf', process_pdf_background, pdf_path, custom_title, custom_tags, download_link,
+                              message='开始生成论文解读...', details=os.path.basename(pdf_path))
+            return jsonify({
+                'success': True,
+                'task_id': task_id,
+                'message': '论文解读任务已启动'
+            })
+        
         # 从PDF创建文章
         article_data, error = processor.create_article_from_pdf(
             pdf_path, custom_title, custom_tags, download_link
@@ -849,7 +1172,7 @@ def upload_pdf():
             return jsonify({
                 'success': True,
                 'message': '论文解读文章生成成功',
-                'article': article_data
+                'article': article_summary(article_data)
             })
         else:
             return jsonify({
@@ -864,6 +1187,41 @@ def upload_pdf():
             'error': str(e)
         }), 500
 
+def process_pdf_background(task_id, pdf_path, custom_title, custom_tags, download_link):
+    """后台从已保存的PDF生成解读文章"""
+    jobs.update(task_id, {
+        'progress': 20,
+        'message': '正在解读论文...',
+        'details': '提取文本并调用AI生成解读'
+    })
+    processor = PDFProcessor()
+    article_data, error = processor.create_article_from_pdf(pdf_path, custom_title, custom_tags, download_link)
+    if error:
+        jobs.update(task_id, {
+            'status': 'failed',
+            'error': error
+        })
+        return
+    
+    jobs.update(task_id, {
+        'progress': 90,
+        'message': '正在保存文章...',
+        'details': article_data.get('title', '')
+    })
+    if processor.update_articles_json(article_data):
+        jobs.update(task_id, {
+            'status': 'completed',
+            'progress': 100,
+            'message': '论文解读文章生成成功',
+            'details': article_data.get('title', ''),
+            'article': article_summary(article_data)
+        })
+    else:
+        jobs.update(task_id, {
+            'status': 'failed',
+            'error': '保存文章失败'
+        })
+
 @app.route('/api/download-pdf/<filename>')
 def download_pdf(filename):
     """下载PDF文件"""
@@ -914,24 +1272,9 @@ def list_pdfs():
 def generate_weekly_report():
     """生成AI周报"""
     try:
-        # 创建任务ID
-        task_id = str(uuid.uuid4())
-        
-        # 初始化任务状态
-        report_tasks[task_id] = {
-            'status': 'running',
-            'progress': 0,
-            'message': '开始生成AI周报...',
-            'details': '正在准备数据',
-            'start_time': time.time(),
-            'article': None,
-            'error': None
-        }
-        
-        # 在后台线程中执行周报生成
-        thread = threading.Thread(target=generate_report_background, args=(task_id,))
-        thread.daemon = True
-        thread.start()
+        # 登记任务并在后台线程中执行周报生成
+        task_id = run_job('weekly_report', generate_report_background,
+                          message='开始生成AI周报...', details='正在准备数据')
         
         return jsonify({
             'success': True,
@@ -948,9 +1291,11 @@ def generate_weekly_report():
 
 def generate_report_background(task_id):
     """后台生成周报"""
+    # 固定一个文章版本：生成期间管理员的编辑不会影响本次读取，也不会被本任务阻塞
+    snapshot = get_store().snapshot()
     try:
         # 更新进度：准备数据
-        report_tasks[task_id].update({
+        jobs.update(task_id, {
             'progress': 10,
             'message': '正在准备数据...',
             'details': '加载文章数据'
@@ -959,49 +1304,42 @@ def generate_report_background(task_id):
         # 创建PDF处理器
         processor = PDFProcessor()
         
-        # 获取所有文章数据
-        articles = load_articles()
+        # 获取所有文章数据，按日期从新到旧排列，周报取最近的文章（正文按需读取）
+        articles = snapshot.articles(by_date=True)
         
         if not articles:
-            report_tasks[task_id].update({
+            jobs.update(task_id, {
                 'status': 'failed',
                 'error': '没有找到文章数据，无法生成周报'
             })
             return
         
         # 更新进度：分析文章
-        report_tasks[task_id].update({
+        jobs.update(task_id, {
             'progress': 30,
             'message': '正在分析文章...',
             'details': f'分析 {len(articles)} 篇文章'
         })
         
         # 更新进度：生成内容
-        report_tasks[task_id].update({
+        jobs.update(task_id, {
             'progress': 50,
             'message': '正在生成周报内容...',
             'details': '调用AI生成周报'
         })
         
         # 生成周报（带进度回调）
-        def progress_callback(progress, message, details):
-            report_tasks[task_id].update({
-                'progress': progress,
-                'message': message,
-                'details': details
-            })
-        
-        report_data, error = processor.generate_weekly_report(articles, progress_callback)
+        report_data, error = processor.generate_weekly_report(articles, jobs.progress_callback(task_id))
         
         if error:
-            report_tasks[task_id].update({
+            jobs.update(task_id, {
                 'status': 'failed',
                 'error': error
             })
             return
         
         # 更新进度：保存文章
-        report_tasks[task_id].update({
+        jobs.update(task_id, {
             'progress': 80,
             'message': '正在保存周报...',
             'details': '更新文章列表'
@@ -1010,42 +1348,48 @@ def generate_report_background(task_id):
         # 保存周报到文章列表
         if processor.update_articles_json(report_data):
             # 更新进度：完成
-            report_tasks[task_id].update({
+            jobs.update(task_id, {
                 'status': 'completed',
                 'progress': 100,
                 'message': '周报生成完成！',
                 'details': '周报已成功保存',
-                'article': report_data
+                'article': article_summary(report_data)
             })
         else:
-            report_tasks[task_id].update({
+            jobs.update(task_id, {
                 'status': 'failed',
                 'error': '保存周报失败'
             })
             
     except Exception as e:
-        report_tasks[task_id].update({
+        jobs.update(task_id, {
             'status': 'failed',
             'error': str(e)
         })
+    finally:
+        snapshot.release()
 
 @app.route('/api/report-progress/<task_id>', methods=['GET'])
 def get_report_progress(task_id):
     """获取周报生成进度"""
+    return job_progress_response(task_id)
+
+def job_progress_response(task_id):
+    """后台任务的进度、结果和错误"""
     try:
-        if task_id not in report_tasks:
+        task = jobs.get(task_id)
+        if task is None:
             return jsonify({
                 'success': False,
                 'error': '任务不存在'
             }), 404
         
-        task = report_tasks[task_id]
-        
         # 计算运行时间
         runtime = time.time() - task['start_time']
         
         return jsonify({
             'success': True,
+            'kind': task['kind'],
             'progress': {
                 'status': task['status'],
                 'percentage': task['progress'],
@@ -1054,6 +1398,7 @@ def get_report_progress(task_id):
                 'runtime': f"{runtime:.1f}秒"
             },
             'article': task.get('article'),
+            'result': task.get('result'),
             'error': task.get('error')
         })
         
@@ -1063,18 +1408,158 @@ def get_report_progress(task_id):
             'error': str(e)
         }), 500
 
+@app.route('/api/jobs/<task_id>', methods=['GET'])
+def get_job(task_id):
+    """获取任意后台任务（周报、抓取、PDF解读、网站构建）的进度和结果"""
+    return job_progress_response(task_id)
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """最近的后台任务，可用kind筛选"""
+    try:
+        limit = int(request.args.get('limit') or 50)
+        tasks = jobs.list(request.args.get('kind') or None, limit)
+        return jsonify({
+            'success': True,
+            'jobs': [{
+                'id': task['id'],
+                'kind': task['kind'],
+                'status': task['status'],
+                'percentage': task.get('progress'),
+                'message': task.get('message'),
+                'start_time': task.get('start_time'),
+                'error': task.get('error')
+            } for task in tasks],
+            'count': len(tasks)
+        })
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'limit必须是整数'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def sse_message(data, event=None, event_id=None):
+    """按 text/event-stream 格式编码一条消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {serializer.dumps_str(data)}")
+    return '\n'.join(lines) + '\n\n'
+
+@app.route('/api/jobs/<task_id>/events', methods=['GET'])
+def stream_job_events(task_id):
+    """以Server-Sent Events推送后台任务进度
+
+    每个进度更新是一条 progress 事件（id为事件序号），任务结束后发送 end 事件并关闭连接；
+    空闲时每 SSE_HEARTBEAT_SECONDS 秒发送心跳注释。重连时浏览器带上 Last-Event-ID
+    （或查询参数 last_event_id），只补发之后的事件。任务结果通过 /api/jobs/<task_id> 读取。
+    本worker的推送连接数达到 SSE_MAX_STREAMS 时返回503
+    """
+    task = jobs.get(task_id)
+    if task is None:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在'
+        }), 404
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Last-Event-ID必须是整数'
+        }), 400
+    if not sse_slots.acquire(blocking=False):
+        response = jsonify({
+            'success': False,
+            'error': '进度推送连接已满，请轮询任务状态',
+            'poll': f'/api/jobs/{task_id}'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(SSE_MAX_SECONDS)
+        return response
+
+    def generate():
+        nonlocal last_id
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        started = last_beat = time.monotonic()
+        status = task['status']
+        while True:
+            for seq, event in jobs.events(task_id, last_id):
+                last_id = seq
+                status = event['status']
+                yield sse_message(event, 'progress', seq)
+            if status in FINISHED_STATUSES:
+                yield sse_message({'status': status}, 'end')
+                return
+            now = time.monotonic()
+            if now - started >= SSE_MAX_SECONDS:
+                return
+            if now - last_beat >= SSE_HEARTBEAT_SECONDS:
+                # 顺便确认任务仍存在、执行进程仍在（进程退出时get()把任务记为interrupted并产生事件）
+                current = jobs.get(task_id)
+                if current is None:
+                    yield sse_message({'status': 'failed', 'error': '任务不存在'}, 'end')
+                    return
+                yield ": heartbeat\n\n"
+                last_beat = now
+            jobs.wait(SSE_POLL_SECONDS)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    # 响应关闭时（推送结束或客户端断开）归还连接名额
+    response.call_on_close(sse_slots.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    # 禁止nginx等反向代理缓冲，事件立即送达
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 # 静态文件服务
 @app.route('/<path:filename>')
 def serve_static(filename):
-    """提供静态文件服务"""
-    response = send_from_directory('.', filename)
-    # 禁用缓存，确保文件更新后立即生效
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    """提供静态文件服务
+
+    构建时生成了 .br/.gz 预压缩文件且客户端接受时直接发送预压缩文件；
+    否则文本文件由压缩钩子按需压缩
+    """
+    path = safe_join('.', filename)
+    compressed, encoding = compression.find_precompressed(path, request.headers.get('Accept-Encoding')) \
+        if path else (None, None)
+    if compressed:
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_file(compressed, mimetype=mimetype, conditional=True)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+    else:
+        response = send_from_directory('.', filename)
+        if response.mimetype in compression.COMPRESSIBLE_TYPES:
+            # 读入内存交给压缩钩子处理
+            response.direct_passthrough = False
+    # 允许浏览器缓存，但每次使用前都重新验证，文件更新后立即生效
+    response.headers['Cache-Control'] = 'no-cache'
     return response
 
+def run_production():
+    """用gunicorn以多进程、多线程方式运行（配置见 gunicorn.conf.py）"""
+    root_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("❌ 未安装gunicorn，请先执行 pip install gunicorn（Windows请使用开发模式）")
+        sys.exit(1)
+    os.chdir(root_dir)
+    os.execvp(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'])
+
 if __name__ == '__main__':
+    if '--production' in sys.argv:
+        print("🚀 以生产模式启动文章管理后台服务器（gunicorn）...")
+        run_production()
+    
     print("🚀 启动文章管理后台服务器...")
     print("📝 管理界面: http://localhost:8888")
     print("📚 文章列表: http://localhost:8888/api/articles")
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""测试公共夹具：每个测试在独立的临时目录中创建文章存储，不读写仓库中的posts/"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import article_store  # noqa: E402
+
+
+def make_store(engine, root):
+    if engine == 'json':
+        return article_store.JsonArticleStore(os.path.join(root, 'store'))
+    return article_store.SQLiteArticleStore(os.path.join(root, 'articles.db'))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """切换到空的临时目录，存储不会从仓库的articles.json迁移数据"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, workdir):
+    return make_store(request.param, str(workdir))
+
+
+@pytest.fixture
+def json_store(workdir):
+    return make_store('json', str(workdir))
+
+
+def article(article_id, content=None, **fields):
+    data = {'id': article_id, 'title': f'标题 {article_id}', 'source': '测试', 'date': '2025-01-01', 'tags': []}
+    data.update(fields)
+    if content is not None:
+        data['content'] = content
+    return data
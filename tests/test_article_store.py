@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""文章存储：日志重放与压缩、重复导入、快照隔离、历史版本"""
+
+import os
+
+import pytest
+
+import article_store
+from conftest import article, make_store
+
+
+def test_journal_replay_rebuilds_state(json_store, workdir):
+    json_store.upsert_many([article('a', '<p>a1</p>'), article('b', '<p>b1</p>')])
+    json_store.update_article('a', {'title': '新标题'})
+    json_store.delete_article('b')
+    json_store.upsert_many([article('c', '<p>c1</p>')])
+    assert os.path.getsize(json_store.journal_file) > 0
+
+    # 新实例只能从快照+日志重放得到当前状态
+    reopened = make_store('json', str(workdir))
+    assert [meta['id'] for meta in reopened.list_articles()] == ['c', 'a']
+    assert reopened.get_article('a')['title'] == '新标题'
+    assert reopened.get_content('c') == '<p>c1</p>'
+    assert reopened.data_version()[0] == json_store.data_version()[0]
+
+
+def test_journal_replay_skips_partial_line(json_store, workdir):
+    json_store.upsert_many([article('a', '<p>a</p>')])
+    # 模拟写到一半崩溃：日志末尾残留半行
+    with open(json_store.journal_file, 'ab') as f:
+        f.write(b'{"op": "upsert", "article": {"id": "bro')
+
+    reopened = make_store('json', str(workdir))
+    assert [meta['id'] for meta in reopened.list_articles()] == ['a']
+    # 之后的写入不会与残留的半行拼在一起
+    reopened.upsert_many([article('b', '<p>b</p>')])
+    assert [meta['id'] for meta in make_store('json', str(workdir)).list_articles()] == ['b', 'a']
+
+
+def test_compaction_folds_journal_into_snapshot(json_store, workdir):
+    for i in range(5):
+        json_store.upsert_many([article(f'a{i}', f'<p>{i}</p>')])
+    json_store.delete_article('a0')
+    version = json_store.data_version()[0]
+
+    json_store.compact()
+    assert os.path.getsize(json_store.journal_file) == 0
+    reopened = make_store('json', str(workdir))
+    assert [meta['id'] for meta in reopened.list_articles()] == ['a4', 'a3', 'a2', 'a1']
+    assert reopened.get_content('a2') == '<p>2</p>'
+    # 压缩后序号延续，数据版本不会倒退
+    assert reopened.data_version()[0] == version
+    reopened.upsert_many([article('a5', '<p>5</p>')])
+    assert reopened.data_version()[0] > version
+
+
+def test_unchanged_reingest_keeps_data_version(store):
+    # 不带summary、url等可选字段的文章重复导入
+    data = article('a', '<p>正文</p>', word_count=2)
+    store.upsert_many([dict(data)])
+    version = store.data_version()[0]
+
+    assert store.upsert_many([dict(data)]) == [False]
+    assert store.upsert_many([dict(data)]) == [False]
+    assert store.data_version()[0] == version
+
+    store.upsert_many([dict(data, title='改过的标题')])
+    assert store.data_version()[0] > version
+
+
+def test_snapshot_isolated_from_writes(store):
+    store.upsert_many([article('a', '<p>旧正文</p>'), article('b', '<p>b</p>')])
+    with store.snapshot() as snap:
+        store.upsert_many([article('a', '<p>新正文</p>', title='新标题')])
+        store.delete_article('b')
+        store.upsert_many([article('c', '<p>c</p>')])
+
+        assert snap.get('a')['title'] == '标题 a'
+        assert snap.get_content('a') == '<p>旧正文</p>'
+        assert snap.get_content('b') == '<p>b</p>'
+        assert snap.get('c') is None
+        assert len(snap) == 2
+
+        assert store.get_article('a')['title'] == '新标题'
+        assert store.get_content('a') == '<p>新正文</p>'
+        assert store.get_article('b') is None
+
+
+def test_snapshots_share_version_until_write(store):
+    store.upsert_many([article('a', '<p>a</p>')])
+    first, second = store.snapshot(), store.snapshot()
+    assert first.version == second.version
+    store.upsert_many([article('b', '<p>b</p>')])
+    third = store.snapshot()
+    assert third.version != first.version
+    for snap in (first, second, third):
+        snap.release()
+    assert store.snapshot_stats()['readers'] == 0
+
+
+@pytest.mark.parametrize('old, new', [
+    ('<p>一</p>\n<p>二</p>\n<p>三</p>', '<p>一</p>\n<p>二改</p>\n<p>三</p>\n<p>四</p>'),
+    ('', '<p>全新</p>'),
+    ('<p>删光</p>', ''),
+])
+def test_content_delta_round_trip(old, new):
+    ops = article_store.content_delta(new, old)
+    assert article_store.apply_delta(new, ops) == old
+    assert article_store._unpack_delta(article_store._pack_delta(ops)) == ops
+
+
+def test_history_versions_and_restore(store, monkeypatch):
+    monkeypatch.setattr(article_store, '_store', store)
+    monkeypatch.setattr(article_store, '_writer', article_store.ArticleWriter(store))
+
+    body = ''.join(f'<p>第{i}段</p>\n' for i in range(200))
+    store.upsert_many([article('a', body)])
+    store.upsert_many([article('a', body.replace('第100段', '第100段（修订）'), title='第二版')])
+    store.upsert_many([article('a', body + '<p>追加</p>\n', title='第三版')])
+
+    versions = store.history('a')
+    assert [entry['version'] for entry in versions] == [2, 1]
+    # 差量只记录改动部分
+    assert all(entry['delta_bytes'] < len(body) // 10 for entry in versions)
+    assert store.get_version('a', 1)['content'] == body
+    assert store.get_version('a', 2)['title'] == '第二版'
+
+    restored = article_store.restore_article_version('a', 1)
+    assert restored['title'] == '标题 a'
+    assert store.get_content('a') == body
+    # 恢复前的版本保存为新的历史版本
+    assert store.history('a')[0]['version'] == 3
+    assert store.get_version('a', 3)['title'] == '第三版'
+    assert article_store.restore_article_version('a', 99) is None
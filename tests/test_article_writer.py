@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""单写线程：命令校验、批次合并、出错命令隔离、持久化开始后的失败"""
+
+import pytest
+
+import article_store
+from conftest import article
+
+
+@pytest.fixture
+def writer(store):
+    # 合并窗口足够长，同一线程连续提交的命令一定落在同一批次
+    return article_store.ArticleWriter(store, window=0.2)
+
+
+@pytest.mark.parametrize('command', [
+    ('upsert', {'title': '没有id'}),
+    ('upsert', ['不是dict']),
+    ('update', 'a'),
+    ('transaction', [('upsert', {})]),
+    ('bogus', 1),
+])
+def test_malformed_commands_rejected_on_submit(writer, command):
+    with pytest.raises(article_store.CommandError):
+        writer.submit(*command)
+    assert writer.stats()['commands'] == 0
+
+
+def test_batch_coalesces_commands(writer, store):
+    futures = [writer.submit('upsert', article(f'a{i}', f'<p>{i}</p>')) for i in range(5)]
+    assert [future.result() for future in futures] == [True] * 5
+    stats = writer.stats()
+    assert stats['batches'] == 1 and stats['max_batch'] == 5
+    assert len(store.list_articles()) == 5
+
+
+def test_failing_command_isolated_from_batch(writer, store):
+    store.upsert_many([article('old', '<p>old</p>')])
+    good = writer.submit('upsert', article('a', '<p>a</p>'))
+    # 格式正确但暂存时出错（正文不是字符串）
+    bad = writer.submit('upsert', article('b', 123))
+    deleted = writer.submit('delete', 'old')
+    missing = writer.submit('delete', 'missing')
+
+    assert good.result() is True
+    assert deleted.result()['id'] == 'old'
+    assert missing.result() is None
+    with pytest.raises(article_store.CommandError):
+        bad.result()
+    assert writer.stats()['split_batches'] == 1
+    assert [meta['id'] for meta in store.list_articles()] == ['a']
+
+
+def test_failure_after_persisting_is_not_retried(workdir):
+    store = article_store.JsonArticleStore(str(workdir / 'store'))
+    writer = article_store.ArticleWriter(store, window=0.2)
+    store.upsert_many([article('a', '<p>旧</p>'), article('gone', '<p>gone</p>')])
+
+    # 日志已追加后写历史版本失败
+    calls = []
+
+    def failing_append(article_id, entry):
+        calls.append(article_id)
+        raise OSError('磁盘已满')
+
+    store._history.append = failing_append
+    futures = [
+        writer.submit('update', 'a', {'content': '<p>新</p>'}),
+        writer.submit('delete', 'gone'),
+        writer.submit('upsert', article('new', '<p>new</p>')),
+    ]
+    for future in futures:
+        with pytest.raises(OSError):
+            future.result()
+
+    # 已提交的变更只生效一次，没有被逐条重试
+    assert calls == ['a']
+    assert writer.stats()['split_batches'] == 0
+    assert store.get_content('a') == '<p>新</p>'
+    assert store.get_article('gone') is None
+    assert store.get_article('new') is not None
+
+
+def test_deferred_blobs_collected_by_writer(writer, store):
+    store.upsert_many([article('a', '<p>被快照引用的正文</p>')])
+    snap = store.snapshot()
+    writer.upsert_article(article('a', '<p>新正文</p>'))
+    assert store.snapshot_stats()['deferred_blobs'] == 1
+    assert snap.get_content('a') == '<p>被快照引用的正文</p>'
+
+    snap.release()
+    # 回收作为命令交给写线程执行；之后提交的命令完成时回收已完成
+    writer.delete_article('missing')
+    assert store.snapshot_stats()['deferred_blobs'] == 0
+    assert writer.stats()['collections'] == 1
+    digest = article_store.content_digest('<p>被快照引用的正文</p>')
+    assert store._load_content({'id': 'a', 'content_sha256': digest}) == ''
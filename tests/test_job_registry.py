@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""后台任务登记表的进度事件，以及SSE推送的 Last-Event-ID 断点续传"""
+
+import threading
+import time
+
+import pytest
+
+from job_registry import JobRegistry
+
+
+@pytest.fixture
+def jobs(workdir):
+    return JobRegistry(str(workdir / 'jobs.db'))
+
+
+def run_steps(jobs, job_id):
+    callback = jobs.progress_callback(job_id)
+    callback(30, '第一步')
+    callback(60, '第二步', '详情')
+    jobs.update(job_id, {'status': 'completed', 'progress': 100, 'result': {'output': '大段输出'}})
+
+
+def test_events_numbered_and_resumable(jobs):
+    job_id = jobs.create('test', {'progress': 0, 'message': '开始'})
+    run_steps(jobs, job_id)
+
+    events = jobs.events(job_id)
+    assert [seq for seq, _ in events] == [1, 2, 3, 4]
+    assert [event['progress'] for _, event in events] == [0, 30, 60, 100]
+    assert events[-1][1]['status'] == 'completed'
+    # 结果不进事件，任务结束后通过get()读取
+    assert 'result' not in events[-1][1]
+    assert jobs.get(job_id)['result'] == {'output': '大段输出'}
+
+    assert [seq for seq, _ in jobs.events(job_id, after=2)] == [3, 4]
+    assert jobs.events(job_id, after=4) == []
+
+
+def test_wait_wakes_on_update(jobs):
+    job_id = jobs.create('test', {})
+    timer = threading.Timer(0.1, jobs.update, (job_id, {'progress': 50}))
+    timer.start()
+    started = time.monotonic()
+    jobs.wait(5)
+    assert time.monotonic() - started < 2
+    timer.join()
+    assert jobs.events(job_id, after=1)[0][1]['progress'] == 50
+
+
+def test_eviction_removes_events(jobs):
+    job_id = jobs.create('test', {})
+    jobs.update(job_id, {'status': 'completed'})
+    jobs.ttl = 0
+    assert jobs.evict_expired(force=True) == 1
+    assert jobs.events(job_id) == []
+
+
+def parse_stream(body):
+    """把text/event-stream拆成 [(id, event, data), ...]，忽略retry和心跳"""
+    messages = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'data' in fields:
+            messages.append((fields.get('id'), fields.get('event'), fields['data']))
+    return messages
+
+
+def stream(client, url, **kwargs):
+    """读取完整的推送内容；关闭响应才会归还推送连接名额（WSGI服务器发送完毕后同样会关闭）"""
+    with client.get(url, **kwargs) as response:
+        return response.status_code, response.mimetype, response.get_data(as_text=True)
+
+
+@pytest.fixture
+def client(jobs, monkeypatch):
+    server = pytest.importorskip('server', reason='需要Flask等服务端依赖')
+    monkeypatch.setattr(server, 'jobs', jobs)
+    return server.app.test_client()
+
+
+def test_sse_resumes_after_last_event_id(client, jobs):
+    job_id = jobs.create('test', {'progress': 0, 'message': '开始'})
+    run_steps(jobs, job_id)
+
+    status, mimetype, body = stream(client, f'/api/jobs/{job_id}/events')
+    assert status == 200
+    assert mimetype == 'text/event-stream'
+    messages = parse_stream(body)
+    assert [message[0] for message in messages] == ['1', '2', '3', '4', None]
+    assert messages[-1][1] == 'end'
+
+    _, _, body = stream(client, f'/api/jobs/{job_id}/events', headers={'Last-Event-ID': '2'})
+    assert [(message[0], message[1]) for message in parse_stream(body)] == \
+        [('3', 'progress'), ('4', 'progress'), (None, 'end')]
+
+    _, _, body = stream(client, f'/api/jobs/{job_id}/events?last_event_id=4')
+    assert [message[1] for message in parse_stream(body)] == ['end']
+
+
+def test_sse_streams_live_updates(client, jobs):
+    job_id = jobs.create('test', {'progress': 0})
+    timer = threading.Timer(0.2, run_steps, (jobs, job_id))
+    timer.start()
+    _, _, body = stream(client, f'/api/jobs/{job_id}/events')
+    timer.join()
+    messages = parse_stream(body)
+    assert [message[0] for message in messages] == ['1', '2', '3', '4', None]
+
+
+def test_sse_stream_cap(client, jobs, monkeypatch):
+    import server
+    monkeypatch.setattr(server, 'sse_slots', threading.BoundedSemaphore(1))
+    job_id = jobs.create('test', {})
+    with client.get(f'/api/jobs/{job_id}/events', buffered=False) as first:
+        assert first.status_code == 200
+        busy = client.get(f'/api/jobs/{job_id}/events')
+        assert busy.status_code == 503
+        assert busy.get_json()['poll'] == f'/api/jobs/{job_id}'
+    jobs.update(job_id, {'status': 'completed'})
+    assert stream(client, f'/api/jobs/{job_id}/events')[0] == 200
+
+
+def test_sse_rejects_unknown_job_and_bad_event_id(client, jobs):
+    assert client.get('/api/jobs/missing/events').status_code == 404
+    job_id = jobs.create('test', {})
+    assert client.get(f'/api/jobs/{job_id}/events', headers={'Last-Event-ID': 'x'}).status_code == 400
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生产环境WSGI入口
+用多进程、多线程的gunicorn运行与开发服务器相同的Flask应用：
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+或 python3 server.py --production。配置见 gunicorn.conf.py。
+"""
+
+import os
+import sys
+
+# 与 python3 server.py 一样以项目根目录为工作目录，相对路径（posts/、articles/等）保持一致
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+os.chdir(ROOT_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from server import app
+
+application = app